@@ -35,6 +35,18 @@ MAX_PARALLEL_WORKERS: int = 4
 API_MAX_RETRIES: int = 3
 API_RETRY_BASE_DELAY: float = 1.0
 
+# Client-side API rate limit (Feishu allows ~5 requests/second per app)
+API_REQUESTS_PER_SECOND: float = 5.0
+# Requests allowed back-to-back before throttling kicks in
+API_RATE_LIMIT_BURST: int = 1
+
+# Gzip raw API request bodies at least this large (0 disables compression)
+API_GZIP_MIN_BYTES: int = 0
+
+# Keep-alive HTTP connection pool for raw Feishu API calls
+HTTP_POOL_CONNECTIONS: int = 4
+HTTP_POOL_MAXSIZE: int = 16
+
 # Whether to use keyring for secure token storage
 USE_KEYRING: bool = True
 
@@ -79,6 +91,7 @@ def _save_token_to_keyring(key: str, value: str) -> bool:
 def load_config_from_json() -> None:
     """Load configuration from sync_config.json and keyring."""
     global FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_USER_ACCESS_TOKEN, FEISHU_USER_REFRESH_TOKEN, FEISHU_ASSETS_TOKEN
+    global API_REQUESTS_PER_SECOND, API_RATE_LIMIT_BURST, API_GZIP_MIN_BYTES
     
     # Load from JSON file
     if os.path.exists(CONFIG_FILE):
@@ -89,12 +102,27 @@ def load_config_from_json() -> None:
                     FEISHU_APP_ID = data.get("feishu_app_id", "")
                     FEISHU_APP_SECRET = data.get("feishu_app_secret", "")
                     FEISHU_ASSETS_TOKEN = data.get("feishu_assets_token", "")
+                    # Optional client-side rate limit overrides
+                    rate = float(data.get("api_requests_per_second", API_REQUESTS_PER_SECOND))
+                    if rate > 0:
+                        API_REQUESTS_PER_SECOND = rate
+                    else:
+                        print(f"api_requests_per_second 必须大于 0，已使用默认值 {API_REQUESTS_PER_SECOND}")
+                    burst = int(data.get("api_rate_limit_burst", API_RATE_LIMIT_BURST))
+                    if burst >= 1:
+                        API_RATE_LIMIT_BURST = burst
+                    else:
+                        print(f"api_rate_limit_burst 必须不小于 1，已使用默认值 {API_RATE_LIMIT_BURST}")
+                    # Optional request body compression threshold
+                    API_GZIP_MIN_BYTES = int(data.get("api_gzip_min_bytes", API_GZIP_MIN_BYTES))
                     
                     # Try to load tokens from keyring first
                     FEISHU_USER_ACCESS_TOKEN = _load_token_from_keyring("access_token") or data.get("feishu_user_access_token", "")
                     FEISHU_USER_REFRESH_TOKEN = _load_token_from_keyring("refresh_token") or data.get("feishu_user_refresh_token", "")
         except json.JSONDecodeError as e:
             print(f"配置文件 JSON 格式错误: {e}")
+        except (TypeError, ValueError) as e:
+            print(f"配置文件取值无效: {e}")
         except IOError as e:
             print(f"读取配置文件失败: {e}")
 
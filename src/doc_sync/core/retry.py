@@ -3,9 +3,13 @@ Retry Module
 Provides retry functionality for API calls with exponential backoff.
 """
 
+import random
 import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from typing import TypeVar, Callable, Optional, Tuple, Type
+import lark_oapi as lark
 import requests
 
 from doc_sync.logger import logger
@@ -14,6 +18,52 @@ from doc_sync.config import API_MAX_RETRIES, API_RETRY_BASE_DELAY
 
 T = TypeVar('T')
 
+# Server hints for when to retry, in order of preference. Feishu's gateway
+# reports the seconds until its rate-limit window resets. Lowercase: header
+# names are matched case-insensitively.
+RETRY_AFTER_HEADERS = ('retry-after', 'x-ogw-ratelimit-reset')
+
+# Feishu codes for requests rejected by rate limiting (app-wide frequency
+# limit, Bitable's per-table limit); nothing was applied, so resending is safe
+RATE_LIMIT_CODES = frozenset((99991400, 1254290))
+
+# Gateway/server failures, worth retrying for calls that are safe to repeat
+TRANSIENT_STATUS_CODES = frozenset((500, 502, 503, 504))
+
+
+def parse_retry_after(response) -> Optional[float]:
+    """
+    Read the server-advertised retry delay from a response.
+    
+    Supports both delta-seconds and HTTP-date values of Retry-After.
+    
+    Args:
+        response: Response object with a ``headers`` mapping
+        
+    Returns:
+        Delay in seconds (never negative), or None if no usable hint
+    """
+    headers = getattr(response, 'headers', None)
+    if not isinstance(headers, Mapping):
+        return None
+    # lark's RawResponse.headers is a plain dict with the wire's casing
+    headers = {str(k).lower(): v for k, v in headers.items()}
+    for name in RETRY_AFTER_HEADERS:
+        value = headers.get(name)
+        if not value or not isinstance(value, str):
+            continue
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if retry_at is not None:
+            return max(0.0, retry_at.timestamp() - time.time())
+    return None
+
 
 def retry_on_failure(
     max_retries: int = API_MAX_RETRIES,
@@ -111,12 +161,9 @@ def api_request_with_retry(
                     delay = base_delay * (2 ** attempt)
                     
                     # Check for Retry-After header
-                    retry_after = response.headers.get('Retry-After')
-                    if retry_after:
-                        try:
-                            delay = max(delay, float(retry_after))
-                        except ValueError:
-                            pass
+                    retry_after = parse_retry_after(response)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
                     
                     logger.warning(f"API 请求收到 {response.status_code}，{delay:.1f}s 后重试")
                     time.sleep(delay)
@@ -200,9 +247,31 @@ def retry_on_rate_limit(
     return decorator
 
 
+def backoff_delay(attempt: int, base_delay: float = API_RETRY_BASE_DELAY,
+                  retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retrying after the given (0-based) failed attempt.
+    
+    Exponential backoff, never shorter than the server's retry hint, plus
+    jitter so concurrent workers don't retry in lockstep.
+    """
+    delay = base_delay * (2 ** attempt)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay + random.uniform(0, 0.25)
+
+
+def _failed_response(msg: str) -> lark.BaseResponse:
+    """An SDK response that reports failure, for calls that got no usable body."""
+    response = lark.BaseResponse()
+    response.msg = msg
+    return response
+
+
 def with_rate_limit_retry(func: Callable, *args, 
                           max_retries: int = API_MAX_RETRIES,
                           base_delay: float = API_RETRY_BASE_DELAY,
+                          retry_transient: bool = False,
                           **kwargs):
     """
     Execute a function with rate limit retry logic.
@@ -210,35 +279,57 @@ def with_rate_limit_retry(func: Callable, *args,
     This is a functional alternative to the decorator for cases where
     you can't use decorators (e.g., dynamically calling different methods).
     
+    lark_oapi responses with a rate-limit code are retried. With
+    ``retry_transient``, 5xx responses, dropped connections and bodies the
+    SDK cannot parse (a gateway's HTML 502 page) are retried too; only pass
+    it for calls that are safe to repeat.
+    
+    An unparseable body that is not retried is turned into a failed
+    response (``success()`` is False) instead of raising.
+    
     Args:
         func: Function to call
         *args: Positional arguments for the function
         max_retries: Maximum retry attempts
         base_delay: Base delay in seconds
+        retry_transient: Also retry server errors and connection failures
         **kwargs: Keyword arguments for the function
         
     Returns:
-        The function's return value
-    """
-    delay = base_delay
-    last_result = None
+        The function's return value (the last one if every attempt failed)
     
+    Raises:
+        requests.ConnectionError, requests.Timeout: If the connection still
+            fails on the last attempt, or on the first for non-idempotent calls
+    """
     for attempt in range(max_retries):
-        result = func(*args, **kwargs)
-        last_result = result
-        
-        # Check for lark_oapi response with rate limit error
-        if hasattr(result, 'code') and result.code == 99991400:
-            if attempt < max_retries - 1:
-                logger.warning(f"Rate limited, retrying in {delay:.1f}s...")
-                time.sleep(delay)
-                delay *= 2
-                continue
+        last_attempt = attempt == max_retries - 1
+        try:
+            result = func(*args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not retry_transient or last_attempt:
+                raise
+            reason, raw = type(e).__name__, None
+        except ValueError as e:
+            # lark unmarshals the body unguarded, so a non-JSON error page raises
+            if not retry_transient or last_attempt:
+                logger.error(f"Unparseable API response: {e}")
+                return _failed_response(f"Unparseable API response: {e}")
+            reason, raw = "Unparseable response", None
+        else:
+            raw = getattr(result, 'raw', None)
+            code = getattr(result, 'code', None)
+            status = getattr(raw, 'status_code', None)
+            if code in RATE_LIMIT_CODES:
+                reason = f"Rate limited ({code})"
+            elif retry_transient and status in TRANSIENT_STATUS_CODES:
+                reason = f"HTTP {status}"
             else:
-                logger.error(f"Rate limit exceeded after {max_retries} retries")
                 return result
-        else:
-            return result
-    
-    return last_result
-
+            if last_attempt:
+                logger.error(f"{reason}, giving up after {max_retries} attempts")
+                return result
+        
+        delay = backoff_delay(attempt, base_delay, parse_retry_after(raw))
+        logger.warning(f"{reason}, retrying in {delay:.1f}s... ({attempt + 1}/{max_retries})")
+        time.sleep(delay)
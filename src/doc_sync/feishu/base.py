@@ -8,26 +8,118 @@ Contains core client functionality:
 - Common utilities
 """
 
+import gzip
+import hashlib
 import json
 import os
-import hashlib
-import time
 import threading
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import requests as requests_module
 import lark_oapi as lark
+import requests as requests_module
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
 
+from doc_sync import config
+from doc_sync.config import (
+    API_MAX_RETRIES,
+    API_RATE_LIMIT_BURST,
+    API_REQUESTS_PER_SECOND,
+    API_RETRY_BASE_DELAY,
+    BATCH_CHUNK_SIZE,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+)
+from doc_sync.core.retry import with_rate_limit_retry
 from doc_sync.logger import logger
-from doc_sync.config import BATCH_CHUNK_SIZE, API_MAX_RETRIES, API_RETRY_BASE_DELAY
+
+# Files below this size are hashed with a single read
+_SMALL_FILE_HASH_LIMIT = 1 << 18  # 256 KiB
+# Larger files are read into a reusable per-thread buffer of this size
+_HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+_hash_buffers = threading.local()
+
+# Seconds before expiry at which a cached tenant token is refreshed
+TENANT_TOKEN_REFRESH_MARGIN = 200
+
+# Block type -> content key (also the SDK Block builder method) for text-like blocks
+CONTENT_KEYS = {
+    2: 'text', 3: 'heading1', 4: 'heading2', 5: 'heading3',
+    6: 'heading4', 7: 'heading5', 8: 'heading6', 9: 'heading7',
+    10: 'heading8', 11: 'heading9', 12: 'bullet', 13: 'ordered',
+    14: 'code', 15: 'quote', 17: 'todo'
+}
+
+
+def _hash_buffer() -> bytearray:
+    """Return this thread's reusable hashing buffer."""
+    buf = getattr(_hash_buffers, "buf", None)
+    if buf is None:
+        buf = _hash_buffers.buf = bytearray(_HASH_CHUNK_SIZE)
+    return buf
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_body(payload: bytes, headers: Dict[str, str]) -> Tuple[bytes, Dict[str, str]]:
+    """Gzip a request body when it reaches API_GZIP_MIN_BYTES.
+    
+    The threshold is read from config on each call, so the
+    ``api_gzip_min_bytes`` setting in sync_config.json applies.
+    
+    Returns the body to send and the headers to send it with.
+    """
+    min_bytes = config.API_GZIP_MIN_BYTES
+    if not min_bytes or len(payload) < min_bytes:
+        return payload, headers
+    return gzip.compress(payload, compresslevel=1), {**headers, "Content-Encoding": "gzip"}
+
+
+def json_loads(data: Any) -> Any:
+    """Parse JSON from bytes or str (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def model_to_dict(obj: Any) -> Any:
+    """Convert a lark_oapi model into plain dicts and lists.
+    
+    Produces the same result as ``json.loads(lark.JSON.marshal(obj))``
+    (None-valued fields are dropped) by walking the model attributes
+    directly, without the JSON encode/decode round-trip.
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, list):
+        return [model_to_dict(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: model_to_dict(v) for k, v in obj.items() if v is not None}
+    if hasattr(obj, "__dict__"):
+        return {k: model_to_dict(v) for k, v in vars(obj).items() if v is not None}
+    return obj
 
 
 class FeishuClientBase:
     """Base class for Feishu API client with authentication and rate limiting."""
     
-    # Rate limiting: max 5 requests per second (飞书 API 限制)
-    _rate_limit_interval = 0.2  # 200ms between requests
-    _last_request_time = 0
+    # Rate limiting: token bucket shared by all clients (飞书 API 限制 ~5 req/s).
+    # config has already applied sync_config.json overrides when this is built.
+    _rate_limit_interval = 1.0 / API_REQUESTS_PER_SECOND  # one token per interval
+    _rate_limit_burst = API_RATE_LIMIT_BURST  # bucket capacity
+    _rate_limit_tat = float("-inf")  # monotonic time at which the bucket is full again
     _rate_limit_lock = threading.Lock()
     
     def __init__(self, app_id: str, app_secret: str, user_access_token: str = None):
@@ -53,32 +145,101 @@ class FeishuClientBase:
         # 每次运行时清除缓存，确保图片重新上传（避免旧 token 失效问题）
         self._asset_cache = {}
         self._clear_asset_cache()
+        # Drive file tokens kept across runs (see _lookup_file_token)
+        self.file_token_cache_path = os.path.join(os.path.dirname(self.asset_cache_path), "file_tokens.json")
+        self._file_tokens: Optional[Dict[str, str]] = None
+        # Media downloads completed by this client: file token -> saved path
+        self._downloaded: Dict[str, str] = {}
+        # Deferred cache writes (see _deferred_cache_writes)
+        self._cache_lock = threading.Lock()
+        self._cache_defer_depth = 0
+        self._cache_dirty = False
+        # Cached tenant access token (see _get_tenant_access_token)
+        self._tenant_token: Optional[str] = None
+        self._tenant_token_expiry = 0.0
+        self._tenant_token_lock = threading.Lock()
+        # Shared keep-alive session for raw HTTP calls (thread-safe for requests)
+        self._http = self._create_http_session()
+
+    @staticmethod
+    def _create_http_session() -> requests_module.Session:
+        """Create a pooled session so repeated API calls reuse TLS connections."""
+        session = requests_module.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    def close(self):
+        """Release pooled HTTP connections."""
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def _rate_limit(self):
-        """Ensure minimum interval between API requests."""
-        with FeishuClientBase._rate_limit_lock:
-            now = time.time()
-            elapsed = now - FeishuClientBase._last_request_time
-            if elapsed < FeishuClientBase._rate_limit_interval:
-                time.sleep(FeishuClientBase._rate_limit_interval - elapsed)
-            FeishuClientBase._last_request_time = time.time()
+        """Wait for a token from the shared rate-limit bucket.
+        
+        Token bucket in virtual-scheduling form: each caller reserves its
+        send time under a short lock and sleeps outside it, so concurrent
+        workers queue up without serializing on the lock while waiting.
+        """
+        cls = FeishuClientBase
+        with cls._rate_limit_lock:
+            now = time.monotonic()
+            interval = cls._rate_limit_interval
+            tat = max(cls._rate_limit_tat, now)
+            slot = max(now, tat - (cls._rate_limit_burst - 1) * interval)
+            cls._rate_limit_tat = tat + interval
+        if slot > now:
+            time.sleep(slot - now)
 
     def _load_asset_cache(self) -> Dict[str, str]:
         """Load asset cache from disk."""
         if os.path.exists(self.asset_cache_path):
             try:
-                with open(self.asset_cache_path, 'r') as f:
-                    return json.load(f)
+                with open(self.asset_cache_path, 'rb') as f:
+                    return json_loads(f.read())
             except (json.JSONDecodeError, IOError, OSError) as e:
                 logger.debug(f"Asset cache load error: {e}")
         return {}
 
+    @contextmanager
+    def _deferred_cache_writes(self) -> Iterator[None]:
+        """Coalesce asset cache saves into a single write on exit.
+        
+        Nested and concurrent uses are counted; the cache is flushed once
+        the outermost block exits and only if something was saved meanwhile.
+        """
+        with self._cache_lock:
+            self._cache_defer_depth += 1
+        try:
+            yield
+        finally:
+            with self._cache_lock:
+                self._cache_defer_depth -= 1
+                flush = self._cache_defer_depth == 0 and self._cache_dirty
+            if flush:
+                self._save_asset_cache()
+
     def _save_asset_cache(self):
-        """Save asset cache to disk."""
+        """Save asset cache to disk (deferred inside _deferred_cache_writes)."""
+        with self._cache_lock:
+            if self._cache_defer_depth > 0:
+                self._cache_dirty = True
+                return
+            self._cache_dirty = False
         try:
             os.makedirs(os.path.dirname(self.asset_cache_path), exist_ok=True)
-            with open(self.asset_cache_path, 'w') as f:
-                json.dump(self._asset_cache, f)
+            with open(self.asset_cache_path, 'wb') as f:
+                f.write(json_dumps(self._asset_cache))
         except Exception as e:
             logger.warning(f"Failed to save asset cache: {e}")
 
@@ -90,12 +251,71 @@ class FeishuClientBase:
         except Exception as e:
             logger.debug(f"Failed to clear asset cache: {e}")
 
+    def _lookup_file_token(self, file_hash: str) -> Optional[str]:
+        """Return a Drive file token uploaded on a previous run, if still valid.
+        
+        Unlike the per-run asset cache, these tokens survive restarts. Each
+        one is checked with a meta query before reuse and forgotten if the
+        file is gone.
+        """
+        with self._cache_lock:
+            if self._file_tokens is None:
+                self._file_tokens = self._load_file_tokens()
+            token = self._file_tokens.get(file_hash)
+        if not token:
+            return None
+        if self.get_file_info(token, obj_type="file") is not None:
+            return token
+        self._store_file_token(file_hash, None)
+        return None
+
+    def _store_file_token(self, file_hash: str, token: Optional[str]):
+        """Persist (or with None, forget) the Drive file token for a hash."""
+        with self._cache_lock:
+            if self._file_tokens is None:
+                self._file_tokens = self._load_file_tokens()
+            if token:
+                self._file_tokens[file_hash] = token
+            else:
+                self._file_tokens.pop(file_hash, None)
+            data = json_dumps(self._file_tokens)
+            try:
+                os.makedirs(os.path.dirname(self.file_token_cache_path), exist_ok=True)
+                with open(self.file_token_cache_path, 'wb') as f:
+                    f.write(data)
+            except OSError as e:
+                logger.warning(f"Failed to save file token cache: {e}")
+
+    def _load_file_tokens(self) -> Dict[str, str]:
+        """Load persisted Drive file tokens from disk."""
+        try:
+            with open(self.file_token_cache_path, 'rb') as f:
+                tokens = json_loads(f.read())
+        except (IOError, OSError, ValueError):
+            return {}
+        return tokens if isinstance(tokens, dict) else {}
+
     def _calculate_file_hash(self, file_path: str) -> str:
         """Calculate SHA256 hash of a file."""
         sha256_hash = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
+            # Most assets are small images: one read + one C-level update
+            if os.fstat(f.fileno()).st_size < _SMALL_FILE_HASH_LIMIT:
+                sha256_hash.update(f.read())
+                return sha256_hash.hexdigest()
+            # Ask for aggressive read-ahead on platforms that support it
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+            buf = _hash_buffer()
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                sha256_hash.update(view[:n])
         return sha256_hash.hexdigest()
 
     def _get_request_option(self):
@@ -104,16 +324,44 @@ class FeishuClientBase:
             return lark.RequestOption.builder().user_access_token(self.user_access_token).build()
         return None
 
+    def _call_api(self, method, request, idempotent: bool = True):
+        """Invoke an SDK method, retrying rate limits and transient failures.
+        
+        Args:
+            method: Bound SDK method, e.g. ``self.client.drive.v1.file.list``
+            request: The built request
+            idempotent: Whether the call is safe to repeat after a 5xx or a
+                dropped connection; creates only retry rate-limit rejections
+        
+        Returns:
+            The SDK response (the last one if every attempt failed)
+        """
+        return with_rate_limit_retry(method, request, self._get_request_option(),
+                                     retry_transient=idempotent)
+
     def _get_tenant_access_token(self) -> Optional[str]:
-        """Get tenant access token from Feishu API."""
+        """Get tenant access token, cached until shortly before it expires."""
+        with self._tenant_token_lock:
+            if self._tenant_token and time.monotonic() < self._tenant_token_expiry:
+                return self._tenant_token
+            return self._fetch_tenant_access_token()
+
+    def _fetch_tenant_access_token(self) -> Optional[str]:
+        """Request a new tenant access token from Feishu API."""
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         headers = {"Content-Type": "application/json; charset=utf-8"}
         data = {"app_id": self.app_id, "app_secret": self.app_secret}
         try:
             self._rate_limit()
-            resp = requests_module.post(url, headers=headers, json=data, timeout=10)
-            if resp.status_code == 200 and resp.json().get("code") == 0:
-                return resp.json().get("tenant_access_token")
+            resp = self._http.post(url, headers=headers, data=json_dumps(data), timeout=10)
+            body = json_loads(resp.content) if resp.status_code == 200 else {}
+            if body.get("code") == 0:
+                self._tenant_token = body.get("tenant_access_token")
+                # Refresh a little early so in-flight requests never carry a stale token
+                self._tenant_token_expiry = (
+                    time.monotonic() + body.get("expire", 7200) - TENANT_TOKEN_REFRESH_MARGIN
+                )
+                return self._tenant_token
             logger.warning(f"获取 tenant_access_token 失败: {resp.status_code}")
             return None
         except requests_module.exceptions.Timeout:
@@ -122,13 +370,6 @@ class FeishuClientBase:
         except requests_module.exceptions.RequestException as e:
             logger.error(f"获取 tenant_access_token 网络错误: {e}")
             return None
-
-    def _get_content_key(self, b_type: int) -> Optional[str]:
-        """Get the content key for a block type."""
-        content_keys = {
-            2: 'text', 3: 'heading1', 4: 'heading2', 5: 'heading3',
-            6: 'heading4', 7: 'heading5', 8: 'heading6', 9: 'heading7',
-            10: 'heading8', 11: 'heading9', 12: 'bullet', 13: 'ordered',
-            14: 'code', 15: 'quote', 17: 'todo'
-        }
-        return content_keys.get(b_type)
+        except ValueError as e:
+            logger.error(f"获取 tenant_access_token 响应解析失败: {e}")
+            return None
@@ -17,7 +17,6 @@ import lark_oapi as lark
 from lark_oapi.api.bitable.v1 import *
 
 from doc_sync.logger import logger
-from doc_sync.config import API_MAX_RETRIES, API_RETRY_BASE_DELAY
 
 
 # Bitable field type constants
@@ -63,7 +62,7 @@ class BitableOperationsMixin:
             .request_body(app_builder.build()) \
             .build()
         
-        response = self.client.bitable.v1.app.create(request, self._get_request_option())
+        response = self._call_api(self.client.bitable.v1.app.create, request, idempotent=False)
         if response.success():
             app = response.data.app
             result = {
@@ -87,7 +86,7 @@ class BitableOperationsMixin:
         """
         self._rate_limit()
         request = GetAppRequest.builder().app_token(app_token).build()
-        response = self.client.bitable.v1.app.get(request, self._get_request_option())
+        response = self._call_api(self.client.bitable.v1.app.get, request)
         if response.success():
             app = response.data.app
             return {
@@ -121,7 +120,7 @@ class BitableOperationsMixin:
             if page_token:
                 builder.page_token(page_token)
             
-            response = self.client.bitable.v1.app_table.list(builder.build(), self._get_request_option())
+            response = self._call_api(self.client.bitable.v1.app_table.list, builder.build())
             if not response.success():
                 logger.error(f"列出数据表失败: {response.code} {response.msg}")
                 return tables
@@ -179,7 +178,7 @@ class BitableOperationsMixin:
                     .build()
             ).build()
         
-        response = self.client.bitable.v1.app_table.create(request, self._get_request_option())
+        response = self._call_api(self.client.bitable.v1.app_table.create, request, idempotent=False)
         if response.success():
             table_id = response.data.table_id
             logger.success(f"创建数据表成功: {name} ({table_id})")
@@ -215,9 +214,7 @@ class BitableOperationsMixin:
                 req_builder.page_token(page_token)
             
             request = req_builder.build()
-            response = self.client.bitable.v1.app_table_field.list(
-                request, self._get_request_option()
-            )
+            response = self._call_api(self.client.bitable.v1.app_table_field.list, request)
             
             if not response.success():
                 logger.error(f"列出字段失败: {response.code} {response.msg}")
@@ -269,9 +266,7 @@ class BitableOperationsMixin:
             .request_body(field_builder.build()) \
             .build()
         
-        response = self.client.bitable.v1.app_table_field.create(
-            request, self._get_request_option()
-        )
+        response = self._call_api(self.client.bitable.v1.app_table_field.create, request, idempotent=False)
         if response.success():
             field_id = response.data.field.field_id
             logger.debug(f"创建字段成功: {field_name} ({field_id})")
@@ -298,9 +293,9 @@ class BitableOperationsMixin:
             .field_id(field_id) \
             .build()
         
-        response = self.client.bitable.v1.app_table_field.delete(
-            request, self._get_request_option()
-        )
+        # A retry after an applied delete would report "not found" as a failure
+        response = self._call_api(self.client.bitable.v1.app_table_field.delete, request,
+                                  idempotent=False)
         if response.success():
             logger.debug(f"删除字段成功: {field_id}")
             return True
@@ -333,7 +328,6 @@ class BitableOperationsMixin:
         """
         records = []
         page_token = None
-        retry_delay = API_RETRY_BASE_DELAY
         
         while True:
             self._rate_limit()
@@ -353,35 +347,22 @@ class BitableOperationsMixin:
             
             request = req_builder.build()
             
-            for attempt in range(API_MAX_RETRIES):
-                response = self.client.bitable.v1.app_table_record.list(
-                    request, self._get_request_option()
-                )
-                
-                if response.success():
-                    if response.data and response.data.items:
-                        for r in response.data.items:
-                            record_data = json_module.loads(lark.JSON.marshal(r))
-                            records.append({
-                                "record_id": record_data.get("record_id"),
-                                "fields": record_data.get("fields", {}),
-                            })
-                    if response.data and response.data.has_more:
-                        page_token = response.data.page_token
-                    else:
-                        page_token = None
-                    break
-                elif response.code == 99991400:  # Rate limit
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"列出记录失败 (rate limited): {response.code} {response.msg}")
-                    return records
-                else:
-                    logger.error(f"列出记录失败: {response.code} {response.msg}")
-                    return records
+            response = self._call_api(self.client.bitable.v1.app_table_record.list, request)
+            if not response.success():
+                logger.error(f"列出记录失败: {response.code} {response.msg}")
+                return records
+            
+            if response.data and response.data.items:
+                for r in response.data.items:
+                    record_data = json_module.loads(lark.JSON.marshal(r))
+                    records.append({
+                        "record_id": record_data.get("record_id"),
+                        "fields": record_data.get("fields", {}),
+                    })
+            if response.data and response.data.has_more:
+                page_token = response.data.page_token
+            else:
+                page_token = None
             
             if not page_token:
                 break
@@ -424,28 +405,15 @@ class BitableOperationsMixin:
                         .build()
                 ).build()
             
-            retry_delay = API_RETRY_BASE_DELAY
-            for attempt in range(API_MAX_RETRIES):
-                response = self.client.bitable.v1.app_table_record.batch_create(
-                    request, self._get_request_option()
-                )
-                
-                if response.success():
-                    if response.data and response.data.records:
-                        for r in response.data.records:
-                            created_ids.append(r.record_id)
-                    logger.debug(f"批量创建 {len(chunk)} 条记录成功")
-                    break
-                elif response.code == 99991400:
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"批量创建记录失败: {response.code} {response.msg}")
-                else:
-                    logger.error(f"批量创建记录失败: {response.code} {response.msg}")
-                    break
+            response = self._call_api(self.client.bitable.v1.app_table_record.batch_create,
+                                      request, idempotent=False)
+            if response.success():
+                if response.data and response.data.records:
+                    for r in response.data.records:
+                        created_ids.append(r.record_id)
+                logger.debug(f"批量创建 {len(chunk)} 条记录成功")
+            else:
+                logger.error(f"批量创建记录失败: {response.code} {response.msg}")
             
             # Throttle between batches
             if i + batch_size < len(records):
@@ -492,27 +460,12 @@ class BitableOperationsMixin:
                         .build()
                 ).build()
             
-            retry_delay = API_RETRY_BASE_DELAY
-            for attempt in range(API_MAX_RETRIES):
-                response = self.client.bitable.v1.app_table_record.batch_update(
-                    request, self._get_request_option()
-                )
-                
-                if response.success():
-                    logger.debug(f"批量更新 {len(chunk)} 条记录成功")
-                    break
-                elif response.code == 99991400:
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"批量更新记录失败: {response.code} {response.msg}")
-                    success = False
-                else:
-                    logger.error(f"批量更新记录失败: {response.code} {response.msg}")
-                    success = False
-                    break
+            response = self._call_api(self.client.bitable.v1.app_table_record.batch_update, request)
+            if response.success():
+                logger.debug(f"批量更新 {len(chunk)} 条记录成功")
+            else:
+                logger.error(f"批量更新记录失败: {response.code} {response.msg}")
+                success = False
             
             if i + batch_size < len(records):
                 time.sleep(0.5)
@@ -549,27 +502,13 @@ class BitableOperationsMixin:
                         .build()
                 ).build()
             
-            retry_delay = API_RETRY_BASE_DELAY
-            for attempt in range(API_MAX_RETRIES):
-                response = self.client.bitable.v1.app_table_record.batch_delete(
-                    request, self._get_request_option()
-                )
-                
-                if response.success():
-                    logger.debug(f"批量删除 {len(chunk)} 条记录成功")
-                    break
-                elif response.code == 99991400:
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"批量删除记录失败: {response.code} {response.msg}")
-                    success = False
-                else:
-                    logger.error(f"批量删除记录失败: {response.code} {response.msg}")
-                    success = False
-                    break
+            response = self._call_api(self.client.bitable.v1.app_table_record.batch_delete,
+                                      request, idempotent=False)
+            if response.success():
+                logger.debug(f"批量删除 {len(chunk)} 条记录成功")
+            else:
+                logger.error(f"批量删除记录失败: {response.code} {response.msg}")
+                success = False
             
             if i + batch_size < len(record_ids):
                 time.sleep(0.5)
@@ -615,9 +554,7 @@ class BitableOperationsMixin:
             if page_token:
                 req_builder.page_token(page_token)
             
-            response = self.client.bitable.v1.app_table_record.search(
-                req_builder.build(), self._get_request_option()
-            )
+            response = self._call_api(self.client.bitable.v1.app_table_record.search, req_builder.build())
             
             if response.success():
                 if response.data and response.data.items:
@@ -662,9 +599,7 @@ class BitableOperationsMixin:
             if page_token:
                 builder.page_token(page_token)
             
-            response = self.client.bitable.v1.app_table_view.list(
-                builder.build(), self._get_request_option()
-            )
+            response = self._call_api(self.client.bitable.v1.app_table_view.list, builder.build())
             if not response.success():
                 logger.error(f"列出视图失败: {response.code} {response.msg}")
                 return views
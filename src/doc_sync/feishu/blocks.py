@@ -2,21 +2,39 @@
 Feishu Block Operations Module
 
 Contains methods for block manipulation:
-- get_block, get_block_children
+- get_block, get_block_children, count_children
 - update_block_text, batch_update_blocks
 - delete_block_children, delete_blocks_by_index
 - add_blocks, create_table
 """
 
-import json
 import time
 from typing import Any, Dict, List, Optional
 
-import lark_oapi as lark
-import requests as requests_module
+from lark_oapi.api.docx.v1 import (
+    BatchDeleteDocumentBlockChildrenRequest,
+    BatchDeleteDocumentBlockChildrenRequestBody,
+    GetDocumentBlockRequest,
+    PatchDocumentBlockRequest,
+    UpdateBlockRequest,
+    UpdateTextElementsRequest,
+)
 
 from doc_sync.logger import logger
-from doc_sync.config import BATCH_CHUNK_SIZE, API_MAX_RETRIES, API_RETRY_BASE_DELAY
+from doc_sync.config import BATCH_CHUNK_SIZE, API_MAX_RETRIES
+from doc_sync.feishu.base import model_to_dict
+from doc_sync.core.retry import (
+    RATE_LIMIT_CODES, TRANSIENT_STATUS_CODES, backoff_delay, parse_retry_after,
+)
+
+
+# Raw-request failures worth retrying: rate limiting and gateway hiccups
+_RETRY_STATUSES = TRANSIENT_STATUS_CODES | {429}
+
+
+# text_element_style keys accepted by update_block_text
+_STYLE_FLAGS = frozenset(("bold", "italic", "strikethrough", "underline", "inline_code"))
+_STYLE_VALUES = frozenset(("background_color", "text_color"))
 
 
 class BlockOperationsMixin:
@@ -32,8 +50,6 @@ class BlockOperationsMixin:
         Returns:
             Dict containing block data, or None if failed
         """
-        from lark_oapi.api.docx.v1 import GetDocumentBlockRequest
-        
         self._rate_limit()
         
         try:
@@ -43,11 +59,10 @@ class BlockOperationsMixin:
                 .document_revision_id(-1) \
                 .build()
             
-            response = self.client.docx.v1.document_block.get(request, self._get_request_option())
+            response = self._call_api(self.client.docx.v1.document_block.get, request)
             
             if response.success():
-                block_data = json.loads(lark.JSON.marshal(response.data.block))
-                return block_data
+                return model_to_dict(response.data.block)
             else:
                 logger.error(f"Get block failed: code={response.code}, msg={response.msg}")
                 return None
@@ -56,6 +71,25 @@ class BlockOperationsMixin:
             logger.error(f"Get block exception: {e}")
             return None
 
+    def count_children(self, document_id: str, block_id: str = None) -> Optional[int]:
+        """Count a block's direct children with a single GET.
+        
+        A block lists its children's IDs, so no paging is needed. The
+        document's total (nested) block count has no such shortcut: the
+        list APIs report no total, so it takes list_document_blocks.
+        
+        Args:
+            document_id: Document ID
+            block_id: Parent block ID (default: the page block)
+        
+        Returns:
+            Number of direct children, or None if the block couldn't be read
+        """
+        block = self.get_block(document_id, block_id or document_id)
+        if block is None:
+            return None
+        return len(block.get("children") or [])
+
     def get_block_children(self, document_id: str, block_id: str,
                            page_size: int = 500,
                            with_descendants: bool = False) -> Optional[List[Dict[str, Any]]]:
@@ -87,53 +121,55 @@ class BlockOperationsMixin:
         all_children = []
         page_token = None
         max_retries = API_MAX_RETRIES
-        retry_delay = API_RETRY_BASE_DELAY
         
         while True:
             self._rate_limit()
             
             params = {"page_size": min(page_size, 500)}
+            if with_descendants:
+                params["with_descendants"] = "true"
             if page_token:
                 params["page_token"] = page_token
             
             for attempt in range(max_retries):
+                last_attempt = attempt == max_retries - 1
                 try:
-                    resp = requests_module.get(url, headers=headers, params=params, timeout=30)
+                    resp = self._http.get(url, headers=headers, params=params, timeout=30)
                     
                     if resp.status_code == 200:
                         data = resp.json()
                         
-                        if data.get("code") == 99991400:  # Rate limit
-                            if attempt < max_retries - 1:
-                                logger.warning(f"Rate limited (99991400), retrying in {retry_delay}s...")
-                                time.sleep(retry_delay)
-                                retry_delay *= 2
-                                continue
-                            else:
+                        if data.get("code") in RATE_LIMIT_CODES:
+                            if last_attempt:
                                 logger.error("Rate limit exceeded after retries")
                                 return all_children if all_children else None
-                        
-                        if data.get("code") == 0:
-                            items = data.get("data", {}).get("items", [])
-                            all_children.extend(items)
-                            page_token = data.get("data", {}).get("page_token")
-                            
-                            if with_descendants:
-                                for item in items:
-                                    if item.get("children"):
-                                        logger.success("Created descendants successfully")
+                            reason = f"Rate limited ({data.get('code')})"
+                        elif data.get("code") == 0:
+                            page = data.get("data", {})
+                            all_children.extend(page.get("items", []))
+                            page_token = page.get("page_token")
+                            # A trailing page_token without has_more must not cost another request
+                            if not page.get("has_more", bool(page_token)):
+                                page_token = None
                             break
                         else:
                             logger.error(f"Get block children failed: {data.get('code')} {data.get('msg')}")
                             return all_children if all_children else None
+                    elif resp.status_code in _RETRY_STATUSES and not last_attempt:
+                        reason = f"HTTP {resp.status_code}"
                     else:
                         logger.error(f"Get block children HTTP error: {resp.status_code}")
                         return all_children if all_children else None
                         
                 except Exception as e:
                     logger.error(f"Get block children exception: {e}")
-                    if attempt == max_retries - 1:
+                    if last_attempt:
                         return all_children if all_children else None
+                    reason, resp = type(e).__name__, None
+                
+                delay = backoff_delay(attempt, retry_after=parse_retry_after(resp))
+                logger.warning(f"{reason}, retrying in {delay:.1f}s...")
+                time.sleep(delay)
             
             if not page_token:
                 break
@@ -152,63 +188,53 @@ class BlockOperationsMixin:
         Returns:
             bool: True if successful
         """
-        from lark_oapi.api.docx.v1 import (
-            PatchDocumentBlockRequest, UpdateBlockRequest, UpdateTextElementsRequest,
-            TextElement, TextRun, TextElementStyle, MentionUser, MentionDoc, Reminder
-        )
-        
         self._rate_limit()
         
         try:
+            # Build the payload as plain dicts; the SDK model is constructed
+            # once from the whole list instead of one builder chain per element
             text_elements = []
             for elem in elements:
-                te_builder = TextElement.builder()
-                
                 if "text_run" in elem:
                     tr = elem["text_run"]
-                    tr_builder = TextRun.builder().content(tr.get("content", ""))
+                    run = {"content": tr.get("content", "")}
                     
                     style = tr.get("text_element_style", {})
                     if style:
-                        style_builder = TextElementStyle.builder()
-                        if style.get("bold"): style_builder.bold(True)
-                        if style.get("italic"): style_builder.italic(True)
-                        if style.get("strikethrough"): style_builder.strikethrough(True)
-                        if style.get("underline"): style_builder.underline(True)
-                        if style.get("inline_code"): style_builder.inline_code(True)
-                        if "background_color" in style: style_builder.background_color(style["background_color"])
-                        if "text_color" in style: style_builder.text_color(style["text_color"])
-                        tr_builder.text_element_style(style_builder.build())
+                        # One pass over the (usually sparse) style dict
+                        style_out = {}
+                        for key, value in style.items():
+                            if key in _STYLE_FLAGS:
+                                if value:
+                                    style_out[key] = True
+                            elif key in _STYLE_VALUES:
+                                style_out[key] = value
+                        run["text_element_style"] = style_out
                     
-                    te_builder.text_run(tr_builder.build())
+                    text_elements.append({"text_run": run})
                 
                 elif "mention_user" in elem:
                     mu = elem["mention_user"]
-                    te_builder.mention_user(
-                        MentionUser.builder().user_id(mu.get("user_id", "")).build()
-                    )
+                    text_elements.append({"mention_user": {"user_id": mu.get("user_id", "")}})
                 
                 elif "mention_doc" in elem:
                     md = elem["mention_doc"]
-                    te_builder.mention_doc(
-                        MentionDoc.builder()
-                            .token(md.get("token", ""))
-                            .obj_type(md.get("obj_type", 1))
-                            .url(md.get("url", ""))
-                            .build()
-                    )
+                    text_elements.append({"mention_doc": {
+                        "token": md.get("token", ""),
+                        "obj_type": md.get("obj_type", 1),
+                        "url": md.get("url", ""),
+                    }})
                 
                 elif "reminder" in elem:
                     rem = elem["reminder"]
-                    te_builder.reminder(
-                        Reminder.builder()
-                            .create_user_id(rem.get("create_user_id", ""))
-                            .expire_time(rem.get("expire_time", ""))
-                            .notify_time(rem.get("notify_time", ""))
-                            .build()
-                    )
+                    text_elements.append({"reminder": {
+                        "create_user_id": rem.get("create_user_id", ""),
+                        "expire_time": rem.get("expire_time", ""),
+                        "notify_time": rem.get("notify_time", ""),
+                    }})
                 
-                text_elements.append(te_builder.build())
+                else:
+                    text_elements.append({})
             
             request = PatchDocumentBlockRequest.builder() \
                 .document_id(document_id) \
@@ -217,15 +243,13 @@ class BlockOperationsMixin:
                 .request_body(
                     UpdateBlockRequest.builder()
                         .update_text_elements(
-                            UpdateTextElementsRequest.builder()
-                                .elements(text_elements)
-                                .build()
+                            UpdateTextElementsRequest({"elements": text_elements})
                         )
                         .build()
                 ) \
                 .build()
             
-            response = self.client.docx.v1.document_block.patch(request, self._get_request_option())
+            response = self._call_api(self.client.docx.v1.document_block.patch, request)
             
             if response.success():
                 logger.debug(f"Block text updated successfully: {block_id}")
@@ -253,57 +277,36 @@ class BlockOperationsMixin:
         Returns:
             bool: True if successful
         """
-        from lark_oapi.api.docx.v1 import (
-            BatchDeleteDocumentBlockChildrenRequest,
-            BatchDeleteDocumentBlockChildrenRequestBody
-        )
-        
         self._rate_limit()
         
-        max_retries = API_MAX_RETRIES
-        retry_delay = API_RETRY_BASE_DELAY
-        
-        for attempt in range(max_retries):
-            try:
-                builder = BatchDeleteDocumentBlockChildrenRequest.builder() \
-                    .document_id(document_id) \
-                    .block_id(block_id) \
-                    .request_body(
-                        BatchDeleteDocumentBlockChildrenRequestBody.builder()
-                            .start_index(start_index)
-                            .end_index(end_index)
-                            .build()
-                    )
-                
-                if client_token:
-                    builder.client_token(client_token)
-                
-                request = builder.build()
-                response = self.client.docx.v1.document_block_children.batch_delete(
-                    request, self._get_request_option()
+        try:
+            builder = BatchDeleteDocumentBlockChildrenRequest.builder() \
+                .document_id(document_id) \
+                .block_id(block_id) \
+                .request_body(
+                    BatchDeleteDocumentBlockChildrenRequestBody.builder()
+                        .start_index(start_index)
+                        .end_index(end_index)
+                        .build()
                 )
+            
+            if client_token:
+                builder.client_token(client_token)
+            
+            # Resending an index range after a lost response could delete the
+            # next blocks, so 5xx is only retried under an idempotency token
+            response = self._call_api(self.client.docx.v1.document_block_children.batch_delete,
+                                      builder.build(), idempotent=bool(client_token))
+            
+            if response.success():
+                logger.debug(f"Deleted blocks [{start_index}:{end_index}] from {block_id}")
+                return True
+            logger.error(f"Delete block children failed: {response.code} {response.msg}")
+            return False
                 
-                if response.success():
-                    logger.debug(f"Deleted blocks [{start_index}:{end_index}] from {block_id}")
-                    return True
-                elif response.code == 99991400:  # Rate limit
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    else:
-                        logger.error("Rate limit exceeded after retries")
-                        return False
-                else:
-                    logger.error(f"Delete block children failed: {response.code} {response.msg}")
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"Delete block children exception: {e}")
-                return False
-        
-        return False
+        except Exception as e:
+            logger.error(f"Delete block children exception: {e}")
+            return False
 
     def delete_blocks_by_index(self, document_id: str, start_index: int, end_index: int) -> bool:
         """Delete blocks by index range from document root."""
@@ -5,17 +5,29 @@ Contains methods for document manipulation:
 - create_docx, clear_document
 - list_document_blocks, get_all_blocks
 - create_folder, list_folder_files
-- get_file_info, delete_file
+- get_file_info, get_file_infos, delete_file
 """
 
-import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import lark_oapi as lark
 from lark_oapi.api.docx.v1 import *
+from lark_oapi.api.docx.v1.model import ListDocumentBlockRequest
+from lark_oapi.api.drive.v1 import (
+    BatchQueryMetaRequest,
+    CreateFolderFileRequest,
+    CreateFolderFileRequestBody,
+    DeleteFileRequest,
+    ListFileRequest,
+    MetaRequest,
+    RequestDoc,
+)
 
 from doc_sync.logger import logger
-from doc_sync.config import API_MAX_RETRIES, API_RETRY_BASE_DELAY
+
+
+# Maximum request_docs per drive meta batch_query call
+META_BATCH_SIZE = 200
 
 
 class DocumentOperationsMixin:
@@ -35,7 +47,7 @@ class DocumentOperationsMixin:
         request = CreateDocumentRequest.builder().request_body(
             CreateDocumentRequestBody.builder().folder_token(parent_token).title(name).build()
         ).build()
-        response = self.client.docx.v1.document.create(request, self._get_request_option())
+        response = self._call_api(self.client.docx.v1.document.create, request, idempotent=False)
         if response.success():
             return response.data.document.document_id
         logger.error(f"创建文档失败: {response.code} {response.msg}")
@@ -43,39 +55,23 @@ class DocumentOperationsMixin:
 
     def list_document_blocks(self, document_id: str) -> List[Any]:
         """List all blocks in a document with rate limit retry."""
-        from lark_oapi.api.docx.v1.model import ListDocumentBlockRequest
         blocks = []
         page_token = None
         
-        max_retries = API_MAX_RETRIES
-        retry_delay = API_RETRY_BASE_DELAY
-        
         while True:
             self._rate_limit()
             builder = ListDocumentBlockRequest.builder().document_id(document_id).page_size(500)
             if page_token: builder.page_token(page_token)
             
-            for attempt in range(max_retries):
-                resp = self.client.docx.v1.document_block.list(builder.build(), self._get_request_option())
-                
-                if resp.success():
-                    if resp.data and resp.data.items: 
-                        blocks.extend(resp.data.items)
-                    page_token = resp.data.page_token
-                    break
-                elif resp.code == 99991400:  # Rate limit
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Rate limited (99991400), retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    else:
-                        logger.error(f"List blocks failed after {max_retries} retries: {resp.code} {resp.msg}")
-                        return blocks
-                else:
-                    logger.error(f"List blocks failed: {resp.code} {resp.msg}")
-                    return blocks
+            resp = self._call_api(self.client.docx.v1.document_block.list, builder.build())
+            if not resp.success():
+                logger.error(f"List blocks failed: {resp.code} {resp.msg}")
+                return blocks
             
+            if resp.data and resp.data.items: 
+                blocks.extend(resp.data.items)
+            # has_more is authoritative; skip the extra empty-page round-trip
+            page_token = resp.data.page_token if resp.data and resp.data.has_more else None
             if not page_token: 
                 break
         
@@ -87,49 +83,26 @@ class DocumentOperationsMixin:
 
     def clear_document(self, document_id: str):
         """Clear all blocks from a document."""
-        self._rate_limit()
-        blocks = self.get_all_blocks(document_id)
-        if not blocks: 
-            return
-        
-        # Find root block and count its children
-        root_block = None
-        for block in blocks:
-            if block.block_type == 1:  # Page block
-                root_block = block
-                break
-        
-        if not root_block or not hasattr(root_block, 'children') or not root_block.children:
-            logger.debug(f"Document {document_id} is already empty")
+        # Only the page block's child count is needed, not every block
+        children_count = self.count_children(document_id)
+        if children_count is None:
             return
-        
-        children_count = len(root_block.children)
         if children_count == 0:
+            logger.debug(f"Document {document_id} is already empty")
             return
         
-        max_retries = API_MAX_RETRIES
-        retry_delay = API_RETRY_BASE_DELAY
-        
-        for attempt in range(max_retries):
-            request = BatchDeleteDocumentBlockChildrenRequest.builder().document_id(document_id).block_id(document_id).request_body(
-                BatchDeleteDocumentBlockChildrenRequestBody.builder().start_index(0).end_index(children_count).build()
-            ).build()
-            resp = self.client.docx.v1.document_block_children.batch_delete(request, self._get_request_option())
-            
-            if resp.success():
-                logger.debug(f"Document {document_id} cleared successfully")
-                return
-            elif resp.code == 99991400:  # Rate limit
-                if attempt < max_retries - 1:
-                    logger.warning(f"Rate limited (99991400), retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    logger.error(f"Clear document failed after {max_retries} retries: {resp.code} {resp.msg}")
-            else:
-                logger.error(f"Clear document failed: {resp.code} {resp.msg}")
-                return
+        self._rate_limit()
+        request = BatchDeleteDocumentBlockChildrenRequest.builder().document_id(document_id).block_id(document_id).request_body(
+            BatchDeleteDocumentBlockChildrenRequestBody.builder().start_index(0).end_index(children_count).build()
+        ).build()
+        # Not idempotent: after an applied delete whose response was lost,
+        # the same index range no longer exists
+        resp = self._call_api(self.client.docx.v1.document_block_children.batch_delete,
+                              request, idempotent=False)
+        if resp.success():
+            logger.debug(f"Document {document_id} cleared successfully")
+        else:
+            logger.error(f"Clear document failed: {resp.code} {resp.msg}")
 
     def create_folder(self, parent_token: str, name: str) -> Optional[str]:
         """Create a folder in Feishu drive.
@@ -141,35 +114,41 @@ class DocumentOperationsMixin:
         Returns:
             New folder token if successful, None otherwise
         """
-        from lark_oapi.api.drive.v1 import CreateFolderFileRequest, CreateFolderFileRequestBody
-        
         self._rate_limit()
         request = CreateFolderFileRequest.builder().request_body(
             CreateFolderFileRequestBody.builder().folder_token(parent_token).name(name).build()
         ).build()
-        resp = self.client.drive.v1.file.create_folder(request, self._get_request_option())
+        resp = self._call_api(self.client.drive.v1.file.create_folder, request, idempotent=False)
         if resp.success():
             return resp.data.token
         return None
 
-    def list_folder_files(self, folder_token: str) -> List[Any]:
-        """List all files in a folder."""
-        from lark_oapi.api.drive.v1 import ListFileRequest
+    def list_folder_files(self, folder_token: str,
+                          stop_when: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """List all files in a folder.
         
-        self._rate_limit()
+        Args:
+            folder_token: Folder to list
+            stop_when: Optional predicate; paging stops after the page that
+                contains the first file matching it
+        """
         files = []
         page_token = None
         
         while True:
+            self._rate_limit()
             builder = ListFileRequest.builder().folder_token(folder_token).page_size(200)
             if page_token:
                 builder.page_token(page_token)
-            resp = self.client.drive.v1.file.list(builder.build(), self._get_request_option())
+            resp = self._call_api(self.client.drive.v1.file.list, builder.build())
             if not resp.success():
                 return files
             if resp.data and resp.data.files:
                 files.extend(resp.data.files)
-            page_token = getattr(resp.data, 'page_token', None) if resp.data else None
+                if stop_when and any(stop_when(f) for f in resp.data.files):
+                    break
+            # Drive returns the cursor as next_page_token, guarded by has_more
+            page_token = resp.data.next_page_token if resp.data and resp.data.has_more else None
             if not page_token:
                 break
         
@@ -177,16 +156,34 @@ class DocumentOperationsMixin:
 
     def get_file_info(self, file_token: str, obj_type: str = "docx") -> Optional[Dict[str, Any]]:
         """Get file information by token."""
-        from lark_oapi.api.drive.v1.model import BatchQueryMetaRequest, MetaRequest, RequestDoc
+        return self.get_file_infos([file_token], obj_type).get(file_token)
+
+    def get_file_infos(self, file_tokens: List[str], obj_type: str = "docx") -> Dict[str, Any]:
+        """Get file information for many tokens of one type.
         
-        self._rate_limit()
-        request = BatchQueryMetaRequest.builder().request_body(
-            MetaRequest.builder().request_docs([RequestDoc.builder().doc_token(file_token).doc_type(obj_type).build()]).build()
-        ).build()
-        resp = self.client.drive.v1.meta.batch_query(request, self._get_request_option())
-        if resp.success() and resp.data.metas:
-            return resp.data.metas[0]
-        return None
+        Tokens are queried META_BATCH_SIZE at a time instead of one call each.
+        
+        Returns:
+            Dict mapping each found token to its meta; unknown or
+            inaccessible tokens are left out
+        """
+        metas = {}
+        unique_tokens = list(dict.fromkeys(file_tokens))
+        for i in range(0, len(unique_tokens), META_BATCH_SIZE):
+            batch = unique_tokens[i:i + META_BATCH_SIZE]
+            self._rate_limit()
+            request = BatchQueryMetaRequest.builder().request_body(
+                MetaRequest.builder().request_docs([
+                    RequestDoc.builder().doc_token(token).doc_type(obj_type).build() for token in batch
+                ]).build()
+            ).build()
+            resp = self._call_api(self.client.drive.v1.meta.batch_query, request)
+            if not resp.success():
+                logger.debug(f"Meta query failed: {resp.code} {resp.msg}")
+                continue
+            for meta in (resp.data.metas if resp.data else None) or []:
+                metas[meta.doc_token] = meta
+        return metas
 
     def delete_file(self, file_token: str, file_type: str = "docx") -> bool:
         """Delete a file or folder by token.
@@ -195,11 +192,10 @@ class DocumentOperationsMixin:
             file_token: The token of the file/folder to delete
             file_type: One of 'file', 'docx', 'folder', 'bitable', 'sheet', etc.
         """
-        from lark_oapi.api.drive.v1 import DeleteFileRequest
-        
         self._rate_limit()
         request = DeleteFileRequest.builder().file_token(file_token).type(file_type).build()
-        resp = self.client.drive.v1.file.delete(request, self._get_request_option())
+        # A retry after an applied delete would report "not found" as a failure
+        resp = self._call_api(self.client.drive.v1.file.delete, request, idempotent=False)
         if resp.success():
             logger.debug(f"Deleted {file_type}: {file_token}")
             return True
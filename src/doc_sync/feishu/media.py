@@ -2,16 +2,45 @@
 Feishu Media Operations Module
 
 Contains methods for media/file handling:
-- upload_image, download_image
+- upload_image, download_image, download_images, prefetch_images
 - upload_file, update_block_image
 """
 
+import mimetypes
 import os
-from typing import Optional
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests as requests_module
+from lark_oapi.api.docx.v1 import (
+    PatchDocumentBlockRequest, UpdateBlockRequest, ReplaceFileRequest
+)
+from requests_toolbelt import MultipartEncoder
 
 from doc_sync.logger import logger
+from doc_sync.config import API_MAX_RETRIES
+from doc_sync.core.retry import TRANSIENT_STATUS_CODES, backoff_delay, parse_retry_after
+from doc_sync.feishu.base import json_dumps
+
+
+# Read buffer for multipart uploads; large enough to keep kernel read-ahead busy
+UPLOAD_READ_BUFFER = 1 << 20
+
+# Chunk and write-buffer size for streamed downloads
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# upload_all rejects larger files; those go through prepare/part/finish
+UPLOAD_ALL_MAX_BYTES = 20 * 1024 * 1024
+_FILES_API = "https://open.feishu.cn/open-apis/drive/v1/files"
+_MEDIAS_API = "https://open.feishu.cn/open-apis/drive/v1/medias"
+
+# Upload failures worth retrying: rate limiting and gateway/server hiccups
+_RETRY_STATUSES = TRANSIENT_STATUS_CODES | {429}
+_RETRY_ERRORS = (requests_module.ConnectionError, requests_module.Timeout)
+
+# Drive upload codes for a parent folder that is gone or no longer ours
+_PARENT_GONE_CODES = frozenset((1061004, 1061044))
 
 
 class MediaOperationsMixin:
@@ -29,7 +58,10 @@ class MediaOperationsMixin:
         Returns:
             File token if successful, None otherwise
         """
-        if not os.path.exists(file_path):
+        # One stat both checks existence and gives the size for the form
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError:
             logger.error(f"Image file not found: {file_path}")
             return None
         
@@ -42,7 +74,7 @@ class MediaOperationsMixin:
         except Exception:
             pass
         
-        url = "https://open.feishu.cn/open-apis/drive/v1/medias/upload_all"
+        url = f"{_MEDIAS_API}/upload_all"
         token = self.user_access_token or self._get_tenant_access_token()
         
         if not token:
@@ -52,53 +84,46 @@ class MediaOperationsMixin:
         headers = {"Authorization": f"Bearer {token}"}
         
         file_name = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
         
         self._rate_limit()
         
         try:
-            import mimetypes
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if not mime_type:
-                mime_type = 'application/octet-stream'
-                
-            with open(file_path, 'rb') as f:
-                files = {'file': (file_name, f, mime_type)}
-                data = {
-                    'file_name': file_name,
-                    'parent_type': 'docx_image',
-                    'parent_node': parent_node_token,
-                    'size': str(file_size),
-                }
-                # 添加 extra 参数，包含 drive_route_token，这是让图片在云文档中正确显示的关键
-                if drive_route_token:
-                    import json
-                    data['extra'] = json.dumps({'drive_route_token': drive_route_token})
-                
-                logger.debug(f"Uploading image: {file_name} ({file_size} bytes) to {parent_node_token}")
-                resp = requests_module.post(url, headers=headers, files=files, data=data, timeout=120)
-                
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get("code") == 0:
-                        file_token = result.get("data", {}).get("file_token")
-                        logger.info(f"Image uploaded successfully: {file_name} -> {file_token}")
-                        logger.debug(f"Upload API full response: {result}")
+            data = {
+                'file_name': file_name,
+                'parent_type': 'docx_image',
+                'parent_node': parent_node_token,
+                'size': str(file_size),
+            }
+            # 添加 extra 参数，包含 drive_route_token，这是让图片在云文档中正确显示的关键
+            if drive_route_token:
+                data['extra'] = json_dumps({'drive_route_token': drive_route_token}).decode()
+            
+            logger.debug(f"Uploading image: {file_name} ({file_size} bytes) to {parent_node_token}")
+            if file_size > UPLOAD_ALL_MAX_BYTES:
+                resp = self._upload_in_parts(_MEDIAS_API, headers, data, file_path, file_name, file_size)
+            else:
+                resp = self._post_multipart(url, headers, data, file_path, file_name)
+            
+            if resp.status_code == 200:
+                result = resp.json()
+                if result.get("code") == 0:
+                    file_token = result.get("data", {}).get("file_token")
+                    logger.debug(f"Image uploaded successfully: {file_name} -> {file_token}")
+                    logger.debug(f"Upload API full response: {result}")
                         
-                        # Cache the result
-                        if file_token:
-                            self._asset_cache[file_hash] = file_token
-                            self._save_asset_cache()
+                    # Cache the result
+                    if file_token:
+                        self._asset_cache[file_hash] = file_token
+                        self._save_asset_cache()
                         
-                        return file_token
-                    else:
-                        logger.error(f"Image upload failed for {file_name}: {result.get('code')} {result.get('msg')} - Request ID: {result.get('request_id')}")
+                    return file_token
                 else:
-                    logger.error(f"Image upload HTTP error for {file_name}: {resp.status_code} - {resp.text}")
+                    logger.error(f"Image upload failed for {file_name}: {result.get('code')} {result.get('msg')} - Request ID: {result.get('request_id')}")
+            else:
+                logger.error(f"Image upload HTTP error for {file_name}: {resp.status_code} - {resp.text}")
                     
         except Exception as e:
             logger.error(f"Image upload exception for {file_name}: {e}")
-            import traceback
             traceback.print_exc()
         
         return None
@@ -113,6 +138,12 @@ class MediaOperationsMixin:
         Returns:
             True if successful
         """
+        # A media token names immutable content, so an image this client has
+        # already saved there is not fetched again (repeated references in a
+        # document, live-sync re-renders)
+        if self._downloaded.get(file_token) == save_path and os.path.exists(save_path):
+            return True
+        
         url = f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download"
         token = self.user_access_token or self._get_tenant_access_token()
         
@@ -123,19 +154,58 @@ class MediaOperationsMixin:
         
         self._rate_limit()
         
+        # Written under a temporary name and renamed when complete, so an
+        # interrupted download never leaves a truncated image at save_path
+        part_path = f"{save_path}.part"
         try:
-            resp = requests_module.get(url, headers=headers, stream=True, timeout=60)
-            if resp.status_code == 200:
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return True
+            # Context manager releases the streamed connection on every path
+            with self._http.get(url, headers=headers, stream=True, timeout=60) as resp:
+                if resp.status_code == 200:
+                    save_dir = os.path.dirname(save_path)
+                    if save_dir:
+                        os.makedirs(save_dir, exist_ok=True)
+                    with open(part_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                        for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                    os.replace(part_path, save_path)
+                    self._downloaded[file_token] = save_path
+                    return True
         except Exception as e:
             logger.error(f"Image download failed: {e}")
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
         
         return False
 
+    def download_images(self, targets: List[Tuple[str, str]]) -> List[bool]:
+        """Download several images concurrently on the shared media pool.
+        
+        Args:
+            targets: (file_token, save_path) pairs
+        
+        Returns:
+            Success flag for each target, in order
+        """
+        return self._map_concurrently(lambda target: self.download_image(*target), targets)
+
+    def prefetch_images(self, blocks: List[Any], save_dir: str) -> None:
+        """Download every image a document's blocks reference, concurrently.
+        
+        Each distinct token is saved as ``<token>.png`` in save_dir, so a
+        converter downloading the same paths afterwards finds them saved.
+        
+        Args:
+            blocks: SDK block models, e.g. from list_document_blocks
+            save_dir: Directory to save the images in
+        """
+        tokens = dict.fromkeys(
+            b.image.token for b in blocks
+            if b.block_type == 27 and b.image and b.image.token
+        )
+        self.download_images([(token, os.path.join(save_dir, f"{token}.png")) for token in tokens])
+
     def upload_file(self, file_path: str, parent_node_token: str, 
                     drive_route_token: str = None, parent_type: str = None) -> Optional[str]:
         """Upload a file to Feishu drive.
@@ -149,9 +219,13 @@ class MediaOperationsMixin:
         Returns:
             File token if successful, None otherwise
         """
-        if not os.path.exists(file_path):
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError:
             return None
         
+        p_type = parent_type or "explorer"
+        
         # Check cache
         try:
             file_hash = self._calculate_file_hash(file_path)
@@ -160,8 +234,16 @@ class MediaOperationsMixin:
                 return self._asset_cache[file_hash]
         except Exception:
             pass
-        
-        url = "https://open.feishu.cn/open-apis/drive/v1/files/upload_all"
+        else:
+            # Drive folder uploads outlive the run; reuse one from a previous sync
+            if p_type == "explorer":
+                file_token = self._lookup_file_token(file_hash)
+                if file_token:
+                    logger.debug(f"File unchanged since last sync: {os.path.basename(file_path)}")
+                    self._asset_cache[file_hash] = file_token
+                    return file_token
+        
+        url = f"{_FILES_API}/upload_all"
         token = self.user_access_token or self._get_tenant_access_token()
         
         if not token:
@@ -170,53 +252,53 @@ class MediaOperationsMixin:
         headers = {"Authorization": f"Bearer {token}"}
         
         file_name = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
-        p_type = parent_type or "explorer"
         
         self._rate_limit()
         
         try:
-            import mimetypes
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if not mime_type:
-                mime_type = 'application/octet-stream'
-
-            with open(file_path, 'rb') as f:
-                files = {'file': (file_name, f, mime_type)}
-                data = {
-                    'file_name': file_name,
-                    'parent_type': p_type,
-                    'parent_node': parent_node_token,
-                    'size': str(file_size)
-                }
-                
-                logger.debug(f"Uploading file: {file_name} ({file_size} bytes) to {parent_node_token}")
-                resp = requests_module.post(url, headers=headers, files=files, data=data, timeout=120)
-                
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get("code") == 0:
-                        file_token = result.get("data", {}).get("file_token")
-                        logger.info(f"File uploaded successfully: {file_name} -> {file_token}")
+            data = {
+                'file_name': file_name,
+                'parent_type': p_type,
+                'parent_node': parent_node_token,
+                'size': str(file_size)
+            }
+            
+            logger.debug(f"Uploading file: {file_name} ({file_size} bytes) to {parent_node_token}")
+            if file_size > UPLOAD_ALL_MAX_BYTES:
+                resp = self._upload_in_parts(_FILES_API, headers, data, file_path, file_name, file_size)
+            else:
+                resp = self._post_multipart(url, headers, data, file_path, file_name)
+            
+            if resp.status_code == 200:
+                result = resp.json()
+                if result.get("code") == 0:
+                    file_token = result.get("data", {}).get("file_token")
+                    logger.debug(f"File uploaded successfully: {file_name} -> {file_token}")
                         
-                        # Cache the result
-                        if file_token:
-                            self._asset_cache[file_hash] = file_token
-                            self._save_asset_cache()
+                    # Cache the result
+                    if file_token:
+                        self._asset_cache[file_hash] = file_token
+                        self._save_asset_cache()
+                        if p_type == "explorer":
+                            self._store_file_token(file_hash, file_token)
                         
-                        return file_token
-                    else:
-                        logger.error(f"File upload failed for {file_name}: {result.get('code')} {result.get('msg')} - Request ID: {result.get('request_id')}")
+                    return file_token
                 else:
-                    logger.error(f"File upload HTTP error for {file_name}: {resp.status_code} - {resp.text}")
+                    logger.error(f"File upload failed for {file_name}: {result.get('code')} {result.get('msg')} - Request ID: {result.get('request_id')}")
+                    if result.get("code") in _PARENT_GONE_CODES:
+                        self._forget_upload_folder(parent_node_token)
+            else:
+                logger.error(f"File upload HTTP error for {file_name}: {resp.status_code} - {resp.text}")
                     
         except Exception as e:
             logger.error(f"File upload exception for {file_name}: {e}")
-            import traceback
             traceback.print_exc()
         
         return None
 
+    def _forget_upload_folder(self, folder_token: str):
+        """Hook called when an upload reports its parent folder gone."""
+
     def update_block_image(self, document_id: str, block_id: str, token: str) -> bool:
         """Update an image block with a new image token.
         
@@ -230,8 +312,6 @@ class MediaOperationsMixin:
         Returns:
             True if successful
         """
-        import requests as req
-        
         self._rate_limit()
         
         url = f"https://open.feishu.cn/open-apis/docx/v1/documents/{document_id}/blocks/{block_id}"
@@ -254,7 +334,7 @@ class MediaOperationsMixin:
         }
         
         try:
-            resp = req.patch(url, headers=headers, params=params, json=body, timeout=30)
+            resp = self._http.patch(url, headers=headers, params=params, data=json_dumps(body), timeout=30)
             result = resp.json()
             
             if resp.status_code == 200 and result.get("code") == 0:
@@ -279,10 +359,6 @@ class MediaOperationsMixin:
         Returns:
             True if successful
         """
-        from lark_oapi.api.docx.v1 import (
-            PatchDocumentBlockRequest, UpdateBlockRequest, ReplaceFileRequest
-        )
-        
         self._rate_limit()
         
         request = PatchDocumentBlockRequest.builder() \
@@ -297,5 +373,112 @@ class MediaOperationsMixin:
                     .build()
             ).build()
         
-        response = self.client.docx.v1.document_block.patch(request, self._get_request_option())
+        response = self._call_api(self.client.docx.v1.document_block.patch, request)
         return response.success()
+
+    def _upload_in_parts(self, base_url: str, headers: Dict[str, str], data: Dict[str, str],
+                         file_path: str, file_name: str, file_size: int) -> requests_module.Response:
+        """Upload a large file or image with the prepare/part/finish API.
+        
+        Parts are sent in order, each read from disk on its own, so memory
+        stays bounded by the server-chosen block size and a failed part is
+        retried without resending the whole file.
+        
+        Args:
+            base_url: _FILES_API or _MEDIAS_API
+            headers: Request headers (Authorization)
+            data: The upload_all form fields (file_name, parent_*, size, extra)
+            file_path: Local path of the file
+            file_name: File name reported to Feishu
+            file_size: Size of the file in bytes
+        
+        Returns:
+            The finish response, or the response of the step that failed
+        """
+        json_headers = dict(headers, **{"Content-Type": "application/json; charset=utf-8"})
+        resp = self._http.post(f"{base_url}/upload_prepare", headers=json_headers,
+                               data=json_dumps(dict(data, size=file_size)), timeout=30)
+        if resp.status_code != 200 or resp.json().get("code") != 0:
+            return resp
+        plan = resp.json()["data"]
+        upload_id, block_size = plan["upload_id"], plan["block_size"]
+        block_num = plan.get("block_num") or -(-file_size // block_size)
+        
+        for seq in range(block_num):
+            offset = seq * block_size
+            length = min(block_size, file_size - offset)
+            self._rate_limit()
+            part = {"upload_id": upload_id, "seq": str(seq), "size": str(length)}
+            resp = self._post_multipart(f"{base_url}/upload_part", headers, part,
+                                        file_path, file_name, offset, length)
+            if resp.status_code != 200 or resp.json().get("code") != 0:
+                return resp
+        
+        self._rate_limit()
+        return self._http.post(f"{base_url}/upload_finish", headers=json_headers,
+                               data=json_dumps({"upload_id": upload_id, "block_num": block_num}), timeout=30)
+
+    def _post_multipart(self, url: str, headers: Dict[str, str], data: Dict[str, str],
+                        file_path: str, file_name: str, offset: int = 0,
+                        length: Optional[int] = None) -> requests_module.Response:
+        """POST a multipart upload, streaming the file body from disk.
+        
+        ``requests`` builds ``files=`` bodies fully in memory, so large
+        attachments would be buffered twice. ``MultipartEncoder`` reads the
+        file lazily while the request is being sent instead.
+        
+        Rate-limited (429), 5xx and dropped-connection attempts are retried
+        with exponential backoff, honoring the server's retry hint; the file
+        is reopened for every attempt.
+        
+        Args:
+            url: Upload endpoint
+            headers: Request headers (Authorization)
+            data: Form fields sent before the file part
+            file_path: Local path of the file to stream
+            file_name: File name reported to Feishu
+            offset: Start of the byte range to send (part uploads)
+            length: Size of the byte range, or None for the rest of the file
+        
+        Returns:
+            The HTTP response (the last one if every attempt failed)
+        """
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if not mime_type:
+            mime_type = 'application/octet-stream'
+        
+        for attempt in range(API_MAX_RETRIES):
+            last_attempt = attempt == API_MAX_RETRIES - 1
+            resp = None
+            try:
+                resp = self._send_multipart(url, headers, data, file_path, file_name,
+                                            mime_type, offset, length)
+            except _RETRY_ERRORS as e:
+                if last_attempt:
+                    raise
+                reason = type(e).__name__
+            else:
+                if last_attempt or resp.status_code not in _RETRY_STATUSES:
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+            
+            delay = backoff_delay(attempt, retry_after=parse_retry_after(resp))
+            logger.warning(f"Upload of {file_name} failed ({reason}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    def _send_multipart(self, url: str, headers: Dict[str, str], data: Dict[str, str],
+                        file_path: str, file_name: str, mime_type: str, offset: int = 0,
+                        length: Optional[int] = None) -> requests_module.Response:
+        """Send one multipart upload attempt over the pooled session."""
+        with open(file_path, 'rb', buffering=UPLOAD_READ_BUFFER) as f:
+            if length is not None:
+                # A single part: bounded by the block size, read in one go
+                f.seek(offset)
+                body = f.read(length)
+            else:
+                body = f
+            fields = dict(data)
+            fields['file'] = (file_name, body, mime_type)
+            encoder = MultipartEncoder(fields=fields)
+            headers = dict(headers, **{"Content-Type": encoder.content_type})
+            return self._http.post(url, headers=headers, data=encoder, timeout=120)
@@ -12,24 +12,171 @@ Architecture:
 """
 
 import os
+import re
+import threading
 import time
 import uuid
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
 
-import lark_oapi as lark
 import requests as requests_module
+from lark_oapi.api.docx.v1 import (
+    CreateDocumentBlockDescendantRequest,
+    CreateDocumentBlockDescendantRequestBody,
+    Block, Table, TableProperty, TableCell, Text, TextElement, TextRun,
+)
+from lark_oapi.api.drive.v1 import CreateFolderFileRequest, CreateFolderFileRequestBody
 
+from doc_sync import config
 from doc_sync.logger import logger
-from doc_sync.config import BATCH_CHUNK_SIZE, API_MAX_RETRIES, API_RETRY_BASE_DELAY
+from doc_sync.core.retry import (
+    RATE_LIMIT_CODES, TRANSIENT_STATUS_CODES, backoff_delay, parse_retry_after,
+)
+from doc_sync.config import BATCH_CHUNK_SIZE, API_MAX_RETRIES, API_RETRY_BASE_DELAY, MAX_PARALLEL_WORKERS
 
 # Import base and mixin classes
-from doc_sync.feishu.base import FeishuClientBase
+from doc_sync.feishu.base import CONTENT_KEYS, FeishuClientBase, encode_body, json_dumps, json_loads
 from doc_sync.feishu.blocks import BlockOperationsMixin
 from doc_sync.feishu.documents import DocumentOperationsMixin
 from doc_sync.feishu.media import MediaOperationsMixin
 from doc_sync.feishu.bitable import BitableOperationsMixin
 
 
+# File block icons by extension (file blocks are sent as text links)
+_FILE_ICONS = (
+    ('.pdf', '📑'),
+    (('.zip', '.rar', '.7z', '.tar'), '📦'),
+    (('.mp4', '.mov', '.avi', '.mkv'), '🎬'),
+)
+_ICON_TABLE = {
+    ext: icon
+    for exts, icon in _FILE_ICONS
+    for ext in (exts if isinstance(exts, tuple) else (exts,))
+}
+
+
+# Shared read-only default for .get() on per-block lookups, instead of a
+# fresh {} per call
+_EMPTY = MappingProxyType({})
+
+# Maximum block updates per batch_update call
+_BATCH_UPDATE_LIMIT = 200
+
+
+def _short_id(prefix: str) -> str:
+    """Temporary block ID for descendants requests (32 random bits)."""
+    return f"{prefix}_{os.urandom(4).hex()}"
+
+
+def _is_empty_text(b: Dict) -> bool:
+    """Check whether a text block has no visible content."""
+    elements = b.get("text", _EMPTY).get("elements") or []
+    return not any(el.get("text_run", _EMPTY).get("content") for el in elements)
+
+
+def _parse_json_body(resp) -> Optional[Dict]:
+    """Parse a JSON response body, or return None if it isn't a JSON object."""
+    try:
+        body = json_loads(resp.content)
+    except (TypeError, ValueError):
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _strip_children(b: Dict) -> Dict:
+    """Return a block without its (separately created) children.
+    
+    The block itself is returned when it has none; callers must not mutate it.
+    """
+    if "children" not in b:
+        return b
+    return {k: v for k, v in b.items() if k != "children"}
+
+
+# Uploaded Feishu media/file tokens: long alphanumeric strings, never paths
+_FEISHU_TOKEN_RE = re.compile(r"[A-Za-z0-9]{20,}")
+
+
+def _is_local_path(token) -> bool:
+    """Check whether a media token is still a local file path (not yet uploaded)."""
+    if not token or not isinstance(token, str):
+        return False
+    if token.startswith("/"):
+        return True
+    # Skip the filesystem check for values that are already Feishu tokens
+    return not _FEISHU_TOKEN_RE.fullmatch(token) and os.path.exists(token)
+
+
+def _clean_file_block(b: Dict) -> Dict:
+    """File block (Type 23): sent as a text link, built directly."""
+    if "file" not in b:
+        return _strip_children(b)
+    f_data = b["file"]
+    token = f_data.get("token")
+    name = f_data.get("name", "File")
+    icon = _ICON_TABLE.get(os.path.splitext(name)[1].lower(), "📄")
+    return {
+        "block_type": 2,
+        "text": {
+            "elements": [{
+                "text_run": {
+                    "content": f"{icon} {name}",
+                    "text_element_style": {"link": {"url": f"https://www.feishu.cn/file/{token}"}}
+                }
+            }]
+        }
+    }
+
+
+def _clean_image_block(b: Dict) -> Dict:
+    """Image block (Type 27): keep only the token (empty until uploaded)."""
+    b_new = {k: v for k, v in b.items() if k != "children"}
+    img_token = b["image"].get("token") if "image" in b else None
+    b_new["image"] = {"token": img_token} if img_token else {}
+    return b_new
+
+
+def _clean_ordered_block(b: Dict) -> Dict:
+    """Ordered list (Type 13): the API requires an elements list."""
+    ordered = b.get("ordered", _EMPTY)
+    if "elements" in ordered:
+        return _strip_children(b)
+    b_new = {k: v for k, v in b.items() if k != "children"}
+    b_new["ordered"] = dict(ordered, elements=[])
+    return b_new
+
+
+def _clean_element_style(el: Dict) -> Dict:
+    """Drop falsy style values and URL-less links from a text run.
+    
+    Returns the element itself when already clean, otherwise a new one;
+    the input is never mutated.
+    """
+    tr = el.get("text_run")
+    if not tr or "text_element_style" not in tr:
+        return el
+    original = tr["text_element_style"] or {}
+    style = {
+        k: v for k, v in original.items()
+        if v and (k != "link" or v.get("url"))
+    }
+    if style and len(style) == len(original):
+        return el  # already clean
+    tr = dict(tr, text_element_style=style) if style else {
+        k: v for k, v in tr.items() if k != "text_element_style"
+    }
+    return dict(el, text_run=tr)
+
+
+# Per-type payload cleaners used by _clean_block; other types are only stripped
+_BLOCK_CLEANERS = {
+    23: _clean_file_block,
+    27: _clean_image_block,
+    13: _clean_ordered_block,
+}
+
+
 class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMixin, MediaOperationsMixin, BitableOperationsMixin):
     """
     Complete Feishu API client with all operations.
@@ -51,6 +198,23 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
     def __init__(self, app_id: str, app_secret: str, user_access_token: str = None):
         """Initialize the Feishu client with credentials."""
         super().__init__(app_id, app_secret, user_access_token)
+        # Drive folder tokens resolved on first file upload
+        self._root_folder_token: Optional[str] = None
+        self._assets_folder_token: Optional[str] = None
+        self._assets_folder_lock = threading.Lock()
+        # Resolved assets folders persisted across runs (see _resolve_assets_folder)
+        self.assets_folder_path = os.path.join(os.path.dirname(self.asset_cache_path), "assets_folder.json")
+        # Upload pool shared by every sibling group, started on first need
+        self._media_executor: Optional[ThreadPoolExecutor] = None
+        self._media_executor_lock = threading.Lock()
+
+    def close(self):
+        """Stop the upload pool and release pooled HTTP connections."""
+        with self._media_executor_lock:
+            executor, self._media_executor = self._media_executor, None
+        if executor is not None:
+            executor.shutdown()
+        super().close()
 
     # =========================================================================
     # Content Conversion Methods
@@ -79,40 +243,49 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
             "Content-Type": "application/json; charset=utf-8"
         }
         
-        body = {"content_type": content_type, "content": content}
-        
-        retry_delay = API_RETRY_BASE_DELAY
+        payload = json_dumps({"content_type": content_type, "content": content})
         
+        # Conversion has no side effects, so 5xx, unparseable bodies and
+        # dropped connections are retried like rate limits
         for attempt in range(API_MAX_RETRIES):
+            last_attempt = attempt == API_MAX_RETRIES - 1
+            resp = None
             try:
-                resp = requests_module.post(url, headers=headers, json=body, timeout=90)
+                resp = self._http.post(url, headers=headers, data=payload, timeout=90)
+                # Parse the body once; Feishu reports errors in it for any status
+                res_json = _parse_json_body(resp)
+                code = res_json.get("code") if res_json else None
                 
-                if resp.status_code == 429 or (resp.status_code == 200 and resp.json().get("code") == 99991400):
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"Rate limited after {API_MAX_RETRIES} retries")
-                    return None
-                
-                if resp.status_code == 200:
-                    res_json = resp.json()
-                    if res_json.get("code") == 0:
-                        data = res_json.get("data", {})
-                        return {
-                            "first_level_block_ids": data.get("first_level_block_ids", []),
-                            "blocks": data.get("blocks", [])
-                        }
-                    logger.error(f"Convert content failed: {res_json.get('code')} {res_json.get('msg')}")
+                if resp.status_code == 429 or code in RATE_LIMIT_CODES:
+                    reason = "rate limited"
+                elif resp.status_code in TRANSIENT_STATUS_CODES:
+                    reason = f"HTTP {resp.status_code}"
+                elif resp.status_code == 200 and res_json is None:
+                    reason = "unparseable response"
+                elif resp.status_code == 200 and code == 0:
+                    data = res_json.get("data", {})
+                    return {
+                        "first_level_block_ids": data.get("first_level_block_ids", []),
+                        "blocks": data.get("blocks", [])
+                    }
+                elif res_json is not None:
+                    logger.error(f"Convert content failed (HTTP {resp.status_code}): {code} {res_json.get('msg')}")
                     return None
                 else:
                     logger.error(f"Convert content HTTP error: {resp.status_code}")
                     return None
-                    
+            except (requests_module.ConnectionError, requests_module.Timeout) as e:
+                reason = type(e).__name__
             except Exception as e:
                 logger.error(f"Convert content exception: {e}")
                 return None
+            
+            if last_attempt:
+                logger.error(f"Convert content {reason} after {API_MAX_RETRIES} attempts")
+                return None
+            delay = backoff_delay(attempt, API_RETRY_BASE_DELAY, parse_retry_after(resp))
+            logger.warning(f"Convert content {reason}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
         
         return None
 
@@ -137,36 +310,46 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
             "Content-Type": "application/json; charset=utf-8"
         }
         
-        body = {"requests": requests}
-        retry_delay = API_RETRY_BASE_DELAY
+        payload = json_dumps({"requests": requests})
         
+        # Throttle once per request; retries are paced by their own backoff.
+        # Block updates are idempotent, so 5xx, unparseable bodies and
+        # dropped connections are retried like rate limits.
+        self._rate_limit()
         for attempt in range(API_MAX_RETRIES):
+            last_attempt = attempt == API_MAX_RETRIES - 1
+            resp = None
             try:
-                self._rate_limit()
-                resp = requests_module.patch(url, headers=headers, json=body, timeout=90)
-                
-                if resp.status_code == 429 or (resp.status_code == 200 and resp.json().get("code") == 99991400):
-                    if attempt < API_MAX_RETRIES - 1:
-                        logger.warning(f"Rate limited, retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    logger.error(f"Rate limited after {API_MAX_RETRIES} retries")
-                    return None
+                resp = self._http.patch(url, headers=headers, data=payload, timeout=90)
+                res_json = _parse_json_body(resp)
+                code = res_json.get("code") if res_json else None
                 
-                if resp.status_code == 200:
-                    res_json = resp.json()
-                    if res_json.get("code") == 0:
+                if resp.status_code == 429 or code in RATE_LIMIT_CODES:
+                    reason = "rate limited"
+                elif resp.status_code in TRANSIENT_STATUS_CODES:
+                    reason = f"HTTP {resp.status_code}"
+                elif resp.status_code == 200 and res_json is None:
+                    reason = "unparseable response"
+                elif resp.status_code == 200:
+                    if code == 0:
                         return res_json.get("data", {}).get("blocks", [])
-                    logger.error(f"Batch update failed: {res_json.get('code')} {res_json.get('msg')}")
+                    logger.error(f"Batch update failed: {code} {res_json.get('msg')}")
                     return None
                 else:
                     logger.error(f"Batch update HTTP error: {resp.status_code}")
                     return None
-                    
+            except (requests_module.ConnectionError, requests_module.Timeout) as e:
+                reason = type(e).__name__
             except Exception as e:
                 logger.error(f"Batch update exception: {e}")
                 return None
+            
+            if last_attempt:
+                logger.error(f"Batch update {reason} after {API_MAX_RETRIES} attempts")
+                return None
+            delay = backoff_delay(attempt, API_RETRY_BASE_DELAY, parse_retry_after(resp))
+            logger.warning(f"Batch update {reason}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
         
         return None
 
@@ -188,6 +371,9 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
             blocks: List of block dicts to add
             index: Insert position (-1 for end)
         """
+        if not blocks:
+            return
+        
         # Separate blocks into groups to maintain order:
         # We need to process blocks sequentially.
         # - Regular blocks can be batched together.
@@ -217,64 +403,120 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         current_index = index
         cumulative_created = 0
         
-        for group in block_groups:
-            # Calculate effective index for this group
-            # If index is -1, we always use -1 (append to end)
-            # If index >= 0, we must offset by how many blocks we've inserted so far
-            group_index = -1 if index == -1 else (index + cumulative_created)
-            
-            if group["type"] == "regular":
-                created_ids = self._process_regular_blocks_group(document_id, group["blocks"], group_index)
-                cumulative_created += len(created_ids)
-            elif group["type"] == "table":
-                success = self.create_table(document_id, group["block"], group_index)
-                if success:
-                    cumulative_created += 1
+        # Uploads record their tokens in the asset cache; write it once at the end
+        with self._deferred_cache_writes():
+            for group in block_groups:
+                # Calculate effective index for this group
+                # If index is -1, we always use -1 (append to end)
+                # If index >= 0, we must offset by how many blocks we've inserted so far
+                group_index = -1 if index == -1 else (index + cumulative_created)
+                
+                if group["type"] == "regular":
+                    created_ids = self._process_regular_blocks_group(document_id, group["blocks"], group_index)
+                    cumulative_created += len(created_ids)
+                elif group["type"] == "table":
+                    success = self.create_table(document_id, group["block"], group_index)
+                    if success:
+                        cumulative_created += 1
     
     def _process_regular_blocks_group(self, document_id: str, blocks: List[Dict], index: int) -> List[str]:
-        """Process a group of regular blocks (including nested recursion)."""
-        all_created_ids = []
-        
-        def create_level(parent_id, current_blocks, insert_index=-1):
-            batch_payload = []
-            children_map = {} 
-            media_tasks = []
-            file_uploads = [] 
-            
-            # ... (Existing logic for preparing batch payload) ...
-            for idx, b in enumerate(current_blocks):
-                b_copy = b.copy()
-                kids = b_copy.pop("children", None)
-                if kids: 
-                    children_map[idx] = kids
-                
-                b_type = b_copy.get("block_type")
-                if b_type == 27:
-                    img_info = b_copy.get("image", {})
-                    token = img_info.get("token")
-                    if token and isinstance(token, str) and (token.startswith("/") or os.path.exists(token)):
-                        b_copy["image"]["token"] = "" 
-                        media_tasks.append({"idx": idx, "path": token, "type": "image"})
-                elif b_type == 23:
-                    f_info = b_copy.get("file", {})
-                    token = f_info.get("token")
-                    if token and isinstance(token, str) and (token.startswith("/") or os.path.exists(token)):
-                        file_uploads.append((idx, token))
-                batch_payload.append(b_copy)
+        """Process a group of regular blocks, creating nested children level by level.
+        
+        Returns:
+            IDs of the created top-level blocks
+        """
+        def create(group):
+            return self._create_level(document_id, group[0], group[1])
+        
+        created_ids, children_map = self._create_level(document_id, document_id, blocks, index)
+        # Breadth-first: every wave holds sibling groups under distinct parents.
+        # Groups within a wave don't affect each other's order, so they can be
+        # created concurrently; chunks of one group stay sequential.
+        wave = self._child_groups(created_ids, children_map)
+        executor = None
+        
+        try:
+            while wave:
+                if len(wave) == 1:
+                    results = [create(wave[0])]
+                else:
+                    # One pool for all waves of this group, started on first need
+                    if executor is None:
+                        executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS)
+                    results = list(executor.map(create, wave))
+                wave = [group for ids, kids in results for group in self._child_groups(ids, kids)]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return created_ids
+
+    @staticmethod
+    def _child_groups(created_ids: List[str], children_map: Dict[int, List[Dict]]) -> List[Tuple[str, List[Dict]]]:
+        """Pair each created block ID with its pending children."""
+        return [(created_ids[idx], kids) for idx, kids in children_map.items() if idx < len(created_ids)]
+
+    def _create_level(self, document_id: str, parent_id: str, current_blocks: List[Dict],
+                      insert_index: int = -1) -> Tuple[List[str], Dict[int, List[Dict]]]:
+        """Create one sibling group under a parent block.
+        
+        Uploads referenced files before creation and images after it (image
+        blocks must exist before their media can be attached). Each distinct
+        local path is uploaded once, however many blocks reference it.
+        
+        Returns:
+            Tuple of (created block IDs, {index: children} for blocks with children)
+        """
+        batch_payload = []
+        children_map = {} 
+        # Local path -> indexes of the blocks referencing it
+        image_uploads: Dict[str, List[int]] = {}
+        file_uploads: Dict[str, List[int]] = {}
+        
+        # Blocks are cleaned for the API in this same pass (_batch_create
+        # sends them as-is). Caller dicts are never mutated: _clean_block
+        # copies only when something has to change.
+        for idx, b in enumerate(current_blocks):
+            if b.get("children"):
+                children_map[idx] = b["children"]
             
-            if not batch_payload: 
-                return []
-
-            if file_uploads:
-                root_folder = self.get_root_folder_token()
-                p_token = root_folder if root_folder else document_id
-                p_type = "explorer" if root_folder else "docx_file"
-                for idx, path in file_uploads:
-                    token = self.upload_file(path, p_token, parent_type=p_type)
+            b_type = b.get("block_type")
+            if b_type == 27:
+                token = b.get("image", _EMPTY).get("token")
+                if _is_local_path(token):
+                    # Created empty; the image is attached once the block exists
+                    b = dict(b, image={})
+                    image_uploads.setdefault(token, []).append(idx)
+            elif b_type == 23:
+                token = b.get("file", _EMPTY).get("token")
+                if _is_local_path(token):
+                    # Cleaned after upload, when its link token is known
+                    file_uploads.setdefault(token, []).append(idx)
+                    batch_payload.append(b)
+                    continue
+            batch_payload.append(self._clean_block(b))
+        
+        if not batch_payload: 
+            return [], {}
+
+        if file_uploads:
+            root_folder = self.get_root_folder_token()
+            p_token = root_folder if root_folder else document_id
+            p_type = "explorer" if root_folder else "docx_file"
+            paths = list(file_uploads)
+            tokens = self._map_concurrently(
+                lambda path: self.upload_file(path, p_token, parent_type=p_type), paths
+            )
+            for path, token in zip(paths, tokens):
+                if token:
+                    logger.success(f"文件已上传: {os.path.basename(path)}")
+                else:
+                    logger.error(f"文件上传失败，跳过: {os.path.basename(path)}")
+                for idx in file_uploads[path]:
                     if token:
-                        batch_payload[idx]["file"]["token"] = token
+                        uploaded = batch_payload[idx]
+                        batch_payload[idx] = self._clean_block(dict(uploaded, file=dict(uploaded["file"], token=token)))
                     else:
-                        logger.error(f"文件上传失败，跳过: {os.path.basename(path)}")
                         batch_payload[idx] = {
                             "block_type": 2,
                             "text": {
@@ -283,32 +525,74 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
                                 }]
                             }
                         }
-            
-            created_ids = self._batch_create(document_id, parent_id, batch_payload, insert_index)
-            if not created_ids: 
-                return []
-
-            for task in media_tasks:
-                idx = task["idx"]
-                if idx < len(created_ids):
-                    block_id = created_ids[idx]
-                    path = task["path"]
-                    file_token = self.upload_image(path, block_id, drive_route_token=document_id)
-                    if file_token:
-                        update_ok = self.update_block_image(document_id, block_id, file_token)
-                        if update_ok:
-                            logger.success(f"图片已上传: {os.path.basename(path)}")
-                        else:
-                            logger.error(f"图片块更新失败: block_id={block_id}, file_token={file_token}")
+        
+        created_ids = self._batch_create(document_id, parent_id, batch_payload, insert_index)
+        if not created_ids: 
+            return [], {}
 
-            for idx, kids in children_map.items():
-                if idx < len(created_ids):
-                    parent_block_id = created_ids[idx]
-                    create_level(parent_block_id, kids)
-            
-            return created_ids
+        image_targets = []
+        for path, indexes in image_uploads.items():
+            block_ids = [created_ids[idx] for idx in indexes if idx < len(created_ids)]
+            if block_ids:
+                image_targets.append((path, block_ids))
+        # Uploads fan out; the token swaps then go out in batch_update calls
+        tokens = self._map_concurrently(
+            lambda target: self.upload_image(target[0], target[1][0], drive_route_token=document_id),
+            image_targets
+        )
+        self._replace_images(document_id, [
+            (block_id, token, path)
+            for (path, block_ids), token in zip(image_targets, tokens) if token
+            for block_id in block_ids
+        ])
+        
+        return created_ids, children_map
+
+    def _replace_images(self, document_id: str, updates: List[Tuple[str, str, str]]):
+        """Point created image blocks at their uploaded images.
+        
+        Sends up to _BATCH_UPDATE_LIMIT replace_image operations per
+        batch_update call; a failed batch falls back to per-block patches.
+        
+        Args:
+            document_id: Document ID
+            updates: (block_id, file_token, local path) per image block
+        """
+        for i in range(0, len(updates), _BATCH_UPDATE_LIMIT):
+            chunk = updates[i:i + _BATCH_UPDATE_LIMIT]
+            if len(chunk) > 1 and self.batch_update_blocks(document_id, [
+                {"block_id": block_id, "replace_image": {"token": token}}
+                for block_id, token, _ in chunk
+            ]) is not None:
+                for _, _, path in chunk:
+                    logger.success(f"图片已上传: {os.path.basename(path)}")
+                continue
+            for block_id, token, path in chunk:
+                if self.update_block_image(document_id, block_id, token):
+                    logger.success(f"图片已上传: {os.path.basename(path)}")
+                else:
+                    logger.error(f"图片块更新失败: block_id={block_id}, file_token={token}")
 
-        return create_level(document_id, blocks, index)
+    def _map_concurrently(self, fn, items: List) -> List:
+        """Apply fn to items on the shared media pool, preserving order.
+        
+        Used for independent media uploads and downloads; a single item runs
+        inline. The pool is shared by concurrently created sibling groups, so
+        in-flight transfers stay bounded by MAX_PARALLEL_WORKERS across the
+        whole document. fn must not itself call _map_concurrently.
+        """
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._media_pool().map(fn, items))
+
+    def _media_pool(self) -> ThreadPoolExecutor:
+        """Return the shared media pool, creating it on first use."""
+        with self._media_executor_lock:
+            if self._media_executor is None:
+                self._media_executor = ThreadPoolExecutor(
+                    max_workers=MAX_PARALLEL_WORKERS, thread_name_prefix="feishu-media"
+                )
+            return self._media_executor
 
     def _batch_create(self, document_id: str, parent_id: str, 
                       blocks_dict_list: List[Dict], index: int = -1) -> List[str]:
@@ -317,7 +601,7 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         Args:
             document_id: Document ID
             parent_id: Parent block ID
-            blocks_dict_list: List of block dicts to create
+            blocks_dict_list: Block dicts to create, already cleaned by _clean_block
             index: Insert position
         
         Returns:
@@ -333,148 +617,95 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         
         created_ids = []
         
-        def clean_block(b):
-            b_new = b.copy()
-            b_type = b_new.get("block_type")
-            b_new.pop("children", None)
-            
-            # Handle File Block (Type 23) - convert to text link
-            if b_type == 23:
-                if "file" in b_new:
-                    f_data = b_new["file"]
-                    token = f_data.get("token")
-                    name = f_data.get("name", "File")
-                    file_url = f"https://www.feishu.cn/file/{token}"
-                    
-                    icon = "📄"
-                    if name.lower().endswith('.pdf'):
-                        icon = "📑"
-                    elif name.lower().endswith(('.zip', '.rar', '.7z', '.tar')):
-                        icon = "📦"
-                    elif name.lower().endswith(('.mp4', '.mov', '.avi', '.mkv')):
-                        icon = "🎬"
-                    
-                    b_new = {
-                        "block_type": 2,
-                        "text": {
-                            "elements": [{
-                                "text_run": {
-                                    "content": f"{icon} {name}",
-                                    "text_element_style": {"link": {"url": file_url}}
-                                }
-                            }]
-                        }
-                    }
-                    b_type = 2
-            
-            # Handle Image Block (Type 27)
-            if b_type == 27:
-                if "image" in b_new:
-                    img_token = b_new["image"].get("token")
-                    b_new["image"] = {"token": img_token} if img_token else {}
-                else:
-                    b_new["image"] = {}
-            
-            # Handle Ordered List Style
-            if b_type == 13:
-                if "ordered" not in b_new: 
-                    b_new["ordered"] = {}
-                if "elements" not in b_new["ordered"]: 
-                    b_new["ordered"]["elements"] = []
-            
-            # Clean empty text_element_style
-            content_key = self._get_content_key(b_type)
-            if content_key and content_key in b_new:
-                content_obj = b_new[content_key]
-                if "elements" in content_obj:
-                    for el in content_obj["elements"]:
-                        if "text_run" in el:
-                            tr = el["text_run"]
-                            if "text_element_style" in tr:
-                                style = tr["text_element_style"]
-                                if not style or all(not v for v in style.values()):
-                                    del tr["text_element_style"]
-                                elif "link" in style:
-                                    if not style["link"] or not style["link"].get("url"):
-                                        del style["link"]
-                                        if not style or all(not v for v in style.values()):
-                                            del tr["text_element_style"]
-            return b_new
-
         # Refactored loop with correct index tracking
         cumulative_created = 0
         
         for i in range(0, len(blocks_dict_list), BATCH_CHUNK_SIZE):
             chunk = blocks_dict_list[i:i + BATCH_CHUNK_SIZE]
-            payload_children = [clean_block(b) for b in chunk]
             
             if index == -1:
                 current_index = -1
             else:
                 current_index = index + cumulative_created
             
-            body = {"children": payload_children, "index": current_index}
-            retry_delay = API_RETRY_BASE_DELAY
+            # Encode once per chunk; retries resend the same bytes
+            payload, chunk_headers = encode_body(json_dumps({
+                "children": chunk,
+                "index": current_index,
+            }), headers)
+            # Same token on every attempt, so a retry after a lost response
+            # cannot create the chunk twice
+            params = {"client_token": str(uuid.uuid4())}
             
-            # Rate limit check for frequency limit (QPS) before request
-            if i > 0:
-                time.sleep(0.4)  # Simple throttling between batches (5 req/s max)
-
+            # QPS is bounded by _rate_limit, shared with concurrent workers;
+            # throttle once per chunk, retries are paced by their own backoff
+            self._rate_limit()
             for attempt in range(API_MAX_RETRIES):
+                last_attempt = attempt == API_MAX_RETRIES - 1
+                resp = None
                 try:
-                    self._rate_limit()
-                    resp = requests_module.post(url, headers=headers, json=body, timeout=90)
+                    resp = self._http.post(url, headers=chunk_headers, params=params,
+                                           data=payload, timeout=(3.05, 90))
+                    # Parse the body once; Feishu reports errors in it for any status
+                    res_json = _parse_json_body(resp)
+                    code = res_json.get("code") if res_json else None
                     
-                    if resp.status_code == 429:
-                        if attempt < API_MAX_RETRIES - 1:
-                            logger.warning(f"Rate limited (429), retrying in {retry_delay}s...")
-                            time.sleep(retry_delay)
-                            retry_delay *= 2
-                            continue
-                        logger.error(f"Rate limited after {API_MAX_RETRIES} retries")
-                        break
-                    
-                    if resp.status_code == 200:
-                        res_json = resp.json()
-                        
-                        # Handle frequency limit (QPS)
-                        if res_json.get("code") == 99991400:
-                            if attempt < API_MAX_RETRIES - 1:
-                                # Exponential backoff with jitter
-                                wait_time = retry_delay * (1 + attempt)
-                                logger.warning(f"Rate limited (99991400), retrying in {wait_time:.1f}s...")
-                                time.sleep(wait_time)
-                                retry_delay *= 2
-                                continue
-                            logger.error(f"Rate limited after retries")
-                            break
-                        
-                        if res_json.get("code") == 0:
-                            batch_created_count = 0
-                            for child in res_json["data"]["children"]:
-                                created_ids.append(child["block_id"])
-                                batch_created_count += 1
-                            cumulative_created += batch_created_count
-                            break
-                        else:
-                            logger.error(f"Batch create failed: {res_json.get('code')} {res_json.get('msg')}")
-                            # Also print full response for debugging specific errors
-                            # logger.debug(f"Full response: {res_json}")
+                    # Handle frequency limit (QPS), as HTTP 429 or a rate-limit code
+                    if resp.status_code == 429 or code in RATE_LIMIT_CODES:
+                        reason = "429" if resp.status_code == 429 else str(code)
+                        if last_attempt:
+                            logger.error(f"Rate limited after {API_MAX_RETRIES} retries")
                             break
+                    elif resp.status_code in TRANSIENT_STATUS_CODES and not last_attempt:
+                        reason = f"HTTP {resp.status_code}"
                     else:
-                        logger.error(f"Batch create failed (HTTP {resp.status_code})")
-                        try:
+                        if resp.status_code == 200 and code == 0:
+                            batch_created = [child["block_id"] for child in res_json["data"]["children"]]
+                            created_ids.extend(batch_created)
+                            cumulative_created += len(batch_created)
+                        elif res_json is not None:
+                            logger.error(f"Batch create failed (HTTP {resp.status_code}): {code} {res_json.get('msg')}")
+                        else:
+                            logger.error(f"Batch create failed (HTTP {resp.status_code})")
                             logger.error(f"Response Body: {resp.text}")
-                        except:
-                            pass
                         break
                         
+                except (requests_module.ConnectionError, requests_module.Timeout) as e:
+                    if last_attempt:
+                        logger.error(f"Batch create exception: {e}")
+                        break
+                    reason = type(e).__name__
                 except Exception as e:
                     logger.error(f"Batch create exception: {e}")
                     break
+                
+                delay = backoff_delay(attempt, API_RETRY_BASE_DELAY, parse_retry_after(resp))
+                logger.warning(f"Batch create {reason}, retrying in {delay:.1f}s...")
+                time.sleep(delay)
                     
         return created_ids
 
+    def _clean_block(self, b: Dict) -> Dict:
+        """Prepare a block dict for the create-children API.
+        
+        Strips children, applies the per-type cleaner and drops empty
+        text_element_style entries.
+        """
+        b_new = _BLOCK_CLEANERS.get(b.get("block_type"), _strip_children)(b)
+        
+        # Clean empty text_element_style
+        content_key = CONTENT_KEYS.get(b_new.get("block_type"))
+        content_obj = b_new.get(content_key) if content_key else None
+        elements = content_obj.get("elements") if content_obj else None
+        if elements:
+            cleaned = [_clean_element_style(el) for el in elements]
+            # Only copy the block if some element actually changed
+            if any(new is not old for new, old in zip(cleaned, elements)):
+                if b_new is b:
+                    b_new = b.copy()
+                b_new[content_key] = dict(content_obj, elements=cleaned)
+        return b_new
+
     # =========================================================================
     # Table Creation Methods
     # =========================================================================
@@ -494,12 +725,6 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         Returns:
             True if successful
         """
-        from lark_oapi.api.docx.v1 import (
-            CreateDocumentBlockDescendantRequest, 
-            CreateDocumentBlockDescendantRequestBody,
-            Block, Table, TableProperty, TableCell, Text, TextElement, TextRun
-        )
-        
         self._rate_limit()
         
         try:
@@ -556,11 +781,8 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
                     .build()) \
                 .build()
             
-            option = lark.RequestOption.builder()
-            if self.user_access_token:
-                option.user_access_token(self.user_access_token)
-            
-            response = self.client.docx.v1.document_block_descendant.create(request, option.build())
+            response = self._call_api(self.client.docx.v1.document_block_descendant.create,
+                                      request, idempotent=False)
             
             if response.success():
                 logger.success("Created descendants successfully")
@@ -584,7 +806,7 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         Returns:
             True if successful
         """
-        table_id = f"table_{uuid.uuid4().hex[:8]}"
+        table_id = _short_id("table")
         
         table_data = table_block.get("table", {})
         prop = table_data.get("property", {})
@@ -592,7 +814,6 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         col_size = prop.get("column_size", 1)
         children = table_block.get("children", [])
         
-        descendants = []
         cell_ids = []
         
         table_desc = {
@@ -605,16 +826,21 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
         column_width = prop.get("column_width")
         if column_width:
             table_desc["table"]["property"]["column_width"] = column_width
+        # The table goes first; filled in with its cell IDs below
+        descendants = [table_desc]
         
         for cell in children:
-            cell_id = f"cell_{uuid.uuid4().hex[:8]}"
+            cell_id = _short_id("cell")
             cell_ids.append(cell_id)
             
             cell_children = cell.get("children", [])
+            # Empty cells need no text descendants; the API accepts bare cells
+            if all(_is_empty_text(tb) for tb in cell_children):
+                cell_children = []
             text_child_ids = []
             
             for text_block in cell_children:
-                text_id = f"text_{uuid.uuid4().hex[:8]}"
+                text_id = _short_id("text")
                 text_child_ids.append(text_id)
                 
                 descendants.append({
@@ -631,103 +857,12 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
             })
         
         table_desc["children"] = cell_ids
-        descendants.insert(0, table_desc)
         
         return self._create_descendants(
             document_id, document_id, [table_id], descendants,
             index
         )
 
-    # =========================================================================
-    # Helper Methods
-    # =========================================================================
-
-    def _dict_to_block_obj(self, b: Dict):
-        """Convert block dict to Block object."""
-        from lark_oapi.api.docx.v1.model import (
-            Block, Text, TextElement, TextElementStyle, TextRun, Link, Image
-        )
-        
-        bt = b.get("block_type")
-        builder = Block.builder().block_type(bt)
-        
-        if bt == 2:
-            builder.text(self._build_text_obj(b.get("text")))
-        elif bt in range(3, 12):
-            h_obj = self._build_text_obj(b.get(f"heading{bt-2}"))
-            heading_methods = {
-                3: builder.heading1, 4: builder.heading2, 5: builder.heading3,
-                6: builder.heading4, 7: builder.heading5, 8: builder.heading6,
-                9: builder.heading7, 10: builder.heading8, 11: builder.heading9
-            }
-            heading_methods[bt](h_obj)
-        elif bt == 12:
-            builder.bullet(self._build_text_obj(b.get("bullet")))
-        elif bt == 13:
-            builder.ordered(self._build_text_obj(b.get("ordered")))
-        elif bt == 14:
-            builder.code(self._build_text_obj(b.get("code")))
-        elif bt == 17:
-            builder.todo(self._build_text_obj(b.get("todo")))
-        elif bt == 27:
-            builder.image(Image.builder().token(b.get("image", {}).get("token")).build())
-        elif bt == 23:
-            f_data = b.get("file", {})
-            t = f_data.get("token")
-            n = f_data.get("name", "File")
-            file_url = f"https://www.feishu.cn/file/{t}"
-            link_style = TextElementStyle.builder().link(Link.builder().url(file_url).build()).build()
-            icon = "📄"
-            if n.lower().endswith('.pdf'):
-                icon = "📑"
-            elif n.lower().endswith('.zip'):
-                icon = "📦"
-            text_run = TextRun.builder().content(f"{icon} {n}").text_element_style(link_style).build()
-            return Block.builder().block_type(2).text(
-                Text.builder().elements([TextElement.builder().text_run(text_run).build()]).build()
-            ).build()
-        
-        return builder.build()
-
-    def _build_text_obj(self, data: Optional[Dict]):
-        """Build Text object from dict."""
-        from lark_oapi.api.docx.v1.model import Text, TextElement, TextElementStyle, TextRun, Link
-        
-        if not data:
-            return None
-        
-        elements = []
-        for e in data.get("elements", []):
-            tr = e.get("text_run")
-            if tr:
-                style_data = tr.get("text_element_style", {})
-                style_builder = TextElementStyle.builder()
-                has_style = False
-                
-                if style_data.get("bold"):
-                    style_builder.bold(True)
-                    has_style = True
-                if style_data.get("italic"):
-                    style_builder.italic(True)
-                    has_style = True
-                if style_data.get("strikethrough"):
-                    style_builder.strikethrough(True)
-                    has_style = True
-                if style_data.get("inline_code"):
-                    style_builder.inline_code(True)
-                    has_style = True
-                if style_data.get("link"):
-                    style_builder.link(Link.builder().url(style_data["link"].get("url")).build())
-                    has_style = True
-                
-                tr_builder = TextRun.builder().content(tr.get("content"))
-                if has_style:
-                    tr_builder.text_element_style(style_builder.build())
-                    
-                elements.append(TextElement.builder().text_run(tr_builder.build()).build())
-        
-        return Text.builder().elements(elements).build()
-
     # =========================================================================
     # Override Methods for Configuration
     # =========================================================================
@@ -739,49 +874,107 @@ class FeishuClient(FeishuClientBase, BlockOperationsMixin, DocumentOperationsMix
     def get_or_create_assets_folder(self) -> Optional[str]:
         """Get or create the assets folder for file uploads.
         
-        Overrides mixin method to support config-based assets token.
+        Overrides mixin method to support config-based assets token. The
+        resolved token is cached for the lifetime of the client and on disk
+        until an upload reports the folder gone.
         """
-        from lark_oapi.api.drive.v1 import CreateFolderFileRequest, CreateFolderFileRequestBody, ListFileRequest
-        
+        if self._assets_folder_token:
+            return self._assets_folder_token
+        with self._assets_folder_lock:
+            if not self._assets_folder_token:
+                self._assets_folder_token = self._resolve_assets_folder()
+            return self._assets_folder_token
+
+    def _resolve_assets_folder(self) -> Optional[str]:
+        """Look up (or create) the assets folder token."""
         # Try config first
-        try:
-            from config import FEISHU_ASSETS_TOKEN
-            if FEISHU_ASSETS_TOKEN:
-                return FEISHU_ASSETS_TOKEN
-        except:
-            pass
-
-        # Get root folder
-        root_token = ""
-        try:
-            url = "https://open.feishu.cn/open-apis/drive/explorer/v2/root_folder/meta"
-            token = self.user_access_token or self._get_tenant_access_token()
-            headers = {"Authorization": f"Bearer {token}"}
-            resp = requests_module.get(url, headers=headers, timeout=30)
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get("code") == 0:
-                    root_token = data["data"]["token"]
-        except:
-            pass
-        
+        if config.FEISHU_ASSETS_TOKEN:
+            return config.FEISHU_ASSETS_TOKEN
+
+        # Then the folder found on a previous run, skipping the drive scan
+        folder_token = self._load_assets_folders().get(self._assets_folder_key())
+        if folder_token:
+            return folder_token
+
+        folder_token = self._discover_assets_folder()
+        if folder_token:
+            self._store_assets_folder(folder_token)
+        return folder_token
+
+    def _discover_assets_folder(self) -> Optional[str]:
+        """Find the assets folder in the drive root, creating it if missing."""
+        root_token = self._get_drive_root_token()
         if not root_token:
             return None
 
-        # Check for existing assets folder
-        list_req = ListFileRequest.builder().folder_token(root_token).build()
-        list_resp = self.client.drive.v1.file.list(list_req, self._get_request_option())
+        # Check for existing assets folder, paging only until it shows up
         target_name = "DocSync_Assets"
-        if list_resp.success() and list_resp.data and list_resp.data.files:
-            for file in list_resp.data.files:
-                if file.name == target_name and file.type == "folder":
-                    return file.token
+
+        def is_target(f) -> bool:
+            return f.name == target_name and f.type == "folder"
+        
+        existing = next((f for f in self.list_folder_files(root_token, stop_when=is_target) if is_target(f)), None)
+        if existing:
+            return existing.token
         
         # Create assets folder
         create_req = CreateFolderFileRequest.builder().request_body(
             CreateFolderFileRequestBody.builder().name(target_name).folder_token(root_token).build()
         ).build()
-        create_resp = self.client.drive.v1.file.create_folder(create_req, self._get_request_option())
+        create_resp = self._call_api(self.client.drive.v1.file.create_folder, create_req, idempotent=False)
         if create_resp.success():
             return create_resp.data.token
         return None
+
+    def _forget_upload_folder(self, folder_token: str):
+        """Drop a cached assets folder that uploads report as gone."""
+        with self._assets_folder_lock:
+            if self._assets_folder_token != folder_token:
+                return
+            self._assets_folder_token = None
+            logger.warning("Assets folder is no longer available, it will be looked up again")
+            self._store_assets_folder(None)
+
+    def _assets_folder_key(self) -> str:
+        """Key of this client's assets folder (per app and identity type)."""
+        return f"{self.app_id}:{'user' if self.user_access_token else 'tenant'}"
+
+    def _load_assets_folders(self) -> Dict[str, str]:
+        """Load persisted assets folder tokens from disk."""
+        try:
+            with open(self.assets_folder_path, 'rb') as f:
+                folders = json_loads(f.read())
+        except (IOError, OSError, ValueError):
+            return {}
+        return folders if isinstance(folders, dict) else {}
+
+    def _store_assets_folder(self, folder_token: Optional[str]):
+        """Persist (or with None, forget) this client's assets folder token."""
+        folders = self._load_assets_folders()
+        if folder_token:
+            folders[self._assets_folder_key()] = folder_token
+        elif folders.pop(self._assets_folder_key(), None) is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.assets_folder_path), exist_ok=True)
+            with open(self.assets_folder_path, 'wb') as f:
+                f.write(json_dumps(folders))
+        except OSError as e:
+            logger.debug(f"Failed to save assets folder: {e}")
+
+    def _get_drive_root_token(self) -> Optional[str]:
+        """Get (and cache) the token of the user's drive root folder."""
+        if self._root_folder_token:
+            return self._root_folder_token
+        try:
+            url = "https://open.feishu.cn/open-apis/drive/explorer/v2/root_folder/meta"
+            token = self.user_access_token or self._get_tenant_access_token()
+            headers = {"Authorization": f"Bearer {token}"}
+            resp = self._http.get(url, headers=headers, timeout=30)
+            if resp.status_code == 200:
+                data = json_loads(resp.content)
+                if data.get("code") == 0:
+                    self._root_folder_token = data["data"]["token"]
+        except Exception as e:
+            logger.debug(f"Root folder lookup failed: {e}")
+        return self._root_folder_token
@@ -23,11 +23,10 @@ except ImportError:
     websockets = None
 
 from doc_sync.feishu_client import FeishuClient
+from doc_sync.feishu.base import model_to_dict
 from doc_sync.live.lock_manager import LockManager
 from doc_sync.logger import logger
 
-import lark_oapi as lark
-
 
 class LiveSyncServer:
     """WebSocket server for real-time block-level collaborative editing.
@@ -330,6 +329,9 @@ class LiveSyncServer:
                 attachments_dir = os.path.join(self.vault_root, "attachments")
                 os.makedirs(attachments_dir, exist_ok=True)
                 
+                # Prefetch concurrently; downloader() then finds them saved
+                self.client.prefetch_images(blocks, attachments_dir)
+                
                 def downloader(token: str):
                     dl_path = os.path.join(attachments_dir, f"{token}.png")
                     result = self.client.download_image(token, dl_path)
@@ -564,7 +566,7 @@ class LiveSyncServer:
         new_blocks: Dict[str, Dict] = {}
         for b in blocks_raw:
             try:
-                d = json.loads(lark.JSON.marshal(b))
+                d = model_to_dict(b)
                 block_id = d.get("block_id")
                 if block_id:
                     new_blocks[block_id] = d
@@ -15,11 +15,10 @@ from enum import IntEnum
 from urllib.parse import unquote
 import difflib
 
-import lark_oapi as lark
-
 from doc_sync import config
 from doc_sync.config import SYNC_DIFF_THRESHOLD
 from doc_sync.feishu_client import FeishuClient
+from doc_sync.feishu.base import model_to_dict
 from doc_sync.converter import MarkdownToFeishu, FeishuToMarkdown
 from doc_sync.utils import pad_center, parse_cloud_time
 from doc_sync.logger import logger
@@ -188,7 +187,7 @@ class SyncManager:
         
         cloud_dicts = []
         for b in cloud_blocks_flat:
-            try: cloud_dicts.append(json.loads(lark.JSON.marshal(b)))
+            try: cloud_dicts.append(model_to_dict(b))
             except: pass
         
         cloud_map = {b["block_id"]: b for b in cloud_dicts}
@@ -427,6 +426,10 @@ class SyncManager:
             attachments_dir = os.path.join(self.vault_root, attachment_folder)
             os.makedirs(attachments_dir, exist_ok=True)
             
+            # Fetch every image up front, concurrently; the converter's
+            # per-block downloads below then find them already saved
+            self.client.prefetch_images(blocks, attachments_dir)
+            
             def download_image(token: str) -> Optional[str]:
                 """Download image and return Obsidian-compatible path."""
                 local_path = os.path.join(attachments_dir, f"{token}.png")
@@ -460,8 +463,7 @@ class SyncManager:
                 indent = "  " * depth
                 content = "???"
                 try:
-                    json_str = lark.JSON.marshal(b)
-                    d = json.loads(json_str)
+                    d = model_to_dict(b)
                     for k in ['text', 'heading1', 'heading2', 'heading3', 'heading4', 
                               'heading5', 'heading6', 'heading7', 'heading8', 'heading9', 
                               'bullet', 'ordered', 'todo', 'code']:
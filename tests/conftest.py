@@ -7,6 +7,7 @@ import sys
 import tempfile
 import shutil
 from typing import Generator, Dict, Any
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -14,6 +15,27 @@ import pytest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch) -> str:
+    """Point ~ at a temporary directory so client caches never touch the real one."""
+    home = str(tmp_path / "home")
+    monkeypatch.setenv("HOME", home)
+    return home
+
+
+@pytest.fixture
+def mock_client():
+    """Create a FeishuClient with a mocked lark client."""
+    with patch('doc_sync.feishu.base.lark') as mock_lark:
+        mock_lark_client = MagicMock()
+        mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
+
+        from doc_sync.feishu_client import FeishuClient
+        client = FeishuClient("test_id", "test_secret", "test_token")
+        client.client = mock_lark_client
+        yield client
+
+
 @pytest.fixture
 def temp_vault() -> Generator[str, None, None]:
     """Create a temporary Obsidian vault for testing."""
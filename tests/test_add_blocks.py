@@ -0,0 +1,509 @@
+"""Tests for FeishuClient.add_blocks and batch block creation."""
+import itertools
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from doc_sync.config import API_MAX_RETRIES
+
+
+def _text(content, children=None):
+    block = {"block_type": 2, "text": {"elements": [{"text_run": {"content": content}}]}}
+    if children:
+        block["children"] = children
+    return block
+
+
+@pytest.fixture
+def recorded_batches(mock_client):
+    """Stub _batch_create, recording (parent_id, contents, index) per call."""
+    calls = []
+    counter = itertools.count()
+
+    def fake_batch_create(document_id, parent_id, blocks, index=-1):
+        contents = [b["text"]["elements"][0]["text_run"]["content"] for b in blocks]
+        calls.append((parent_id, contents, index))
+        return [f"id_{next(counter)}" for _ in blocks]
+
+    mock_client._batch_create = fake_batch_create
+    return calls
+
+
+class TestAddBlocksNesting:
+    """Test nested children creation."""
+
+    def test_flat_blocks_single_batch(self, mock_client, recorded_batches):
+        """Sibling blocks are created in one batch under the document."""
+        mock_client.add_blocks("doc", [_text("a"), _text("b")])
+
+        assert recorded_batches == [("doc", ["a", "b"], -1)]
+
+    def test_empty_input_is_a_no_op(self, mock_client, recorded_batches):
+        """No blocks: no API calls and no asset cache write."""
+        mock_client._save_asset_cache = MagicMock()
+
+        mock_client.add_blocks("doc", [])
+
+        assert recorded_batches == []
+        mock_client._save_asset_cache.assert_not_called()
+
+    def test_children_created_under_parent_ids(self, mock_client, recorded_batches):
+        """Each child group is created under the ID of its parent block."""
+        blocks = [
+            _text("a", children=[_text("a1"), _text("a2", children=[_text("a2x")])]),
+            _text("b", children=[_text("b1")]),
+        ]
+
+        mock_client.add_blocks("doc", blocks, index=3)
+
+        assert recorded_batches[0] == ("doc", ["a", "b"], 3)
+        by_parent = {parent: (contents, index) for parent, contents, index in recorded_batches[1:]}
+        assert by_parent["id_0"] == (["a1", "a2"], -1)
+        assert by_parent["id_1"] == (["b1"], -1)
+        a2_id = next(p for p, (c, _) in by_parent.items() if c == ["a2x"])
+        assert a2_id not in ("doc", "id_0", "id_1")
+        assert len(recorded_batches) == 4
+
+    def test_children_not_sent_in_payload(self, mock_client):
+        """The children key is stripped before blocks are sent."""
+        sent = []
+        mock_client._batch_create = lambda d, p, blocks, index=-1: sent.extend(blocks) or [f"x{i}" for i in range(len(blocks))]
+
+        mock_client.add_blocks("doc", [_text("a", children=[_text("a1")])])
+
+        assert all("children" not in b for b in sent)
+
+    def test_payload_cleaned_before_batch_create(self, mock_client):
+        """_create_level hands _batch_create API-ready blocks."""
+        sent = []
+        mock_client._batch_create = lambda d, p, blocks, index=-1: sent.extend(blocks) or ["x"] * len(blocks)
+
+        mock_client.add_blocks("doc", [
+            {"block_type": 13, "ordered": {}},
+            {"block_type": 23, "file": {"token": "boxcnAAAAAAAAAAAAAAAAAAAA", "name": "a.zip"}},
+        ])
+
+        assert sent[0]["ordered"] == {"elements": []}
+        assert sent[1]["block_type"] == 2
+
+    def test_child_groups_of_one_level_run_concurrently(self, mock_client):
+        """Sibling groups under different parents are created in parallel."""
+        barrier = threading.Barrier(2, timeout=5)
+        counter = itertools.count()
+
+        def fake_batch_create(document_id, parent_id, blocks, index=-1):
+            if parent_id != "doc":
+                barrier.wait()  # both child groups must be in flight together
+            return [f"id_{next(counter)}" for _ in blocks]
+
+        mock_client._batch_create = fake_batch_create
+
+        mock_client.add_blocks("doc", [_text("a", children=[_text("a1")]), _text("b", children=[_text("b1")])])
+
+        assert not barrier.broken
+
+
+class TestMediaUploads:
+    """Test media upload handling during block creation."""
+
+    def test_images_uploaded_concurrently_to_their_blocks(self, mock_client, tmp_path):
+        """Each image block gets its own upload, with uploads in flight together."""
+        paths = [str(tmp_path / f"{n}.png") for n in ("a", "b")]
+        barrier = threading.Barrier(2, timeout=5)
+        mock_client._batch_create = lambda d, p, blocks, index=-1: ["blk_a", "blk_b"]
+        mock_client.upload_image = MagicMock(side_effect=lambda path, block_id, **kw: (barrier.wait(), f"tok_{block_id}")[1])
+        mock_client.batch_update_blocks = MagicMock(return_value=[])
+
+        mock_client.add_blocks("doc", [{"block_type": 27, "image": {"token": p}} for p in paths])
+
+        assert not barrier.broken
+        mock_client.batch_update_blocks.assert_called_once_with("doc", [
+            {"block_id": "blk_a", "replace_image": {"token": "tok_blk_a"}},
+            {"block_id": "blk_b", "replace_image": {"token": "tok_blk_b"}},
+        ])
+
+    def test_image_swaps_fall_back_to_single_patches(self, mock_client):
+        """If the batch update fails, each image block is patched on its own."""
+        mock_client.batch_update_blocks = MagicMock(return_value=None)
+        mock_client.update_block_image = MagicMock(return_value=True)
+
+        mock_client._replace_images("doc", [("b1", "t1", "/a.png"), ("b2", "t2", "/b.png")])
+
+        updates = [c.args for c in mock_client.update_block_image.call_args_list]
+        assert updates == [("doc", "b1", "t1"), ("doc", "b2", "t2")]
+
+    def test_image_swaps_chunked_at_api_limit(self, mock_client):
+        """More image swaps than one batch_update accepts are split."""
+        from doc_sync.feishu_client import _BATCH_UPDATE_LIMIT
+
+        mock_client.batch_update_blocks = MagicMock(return_value=[])
+        updates = [(f"b{i}", "t", "/a.png") for i in range(_BATCH_UPDATE_LIMIT + 2)]
+
+        mock_client._replace_images("doc", updates)
+
+        sizes = [len(c.args[1]) for c in mock_client.batch_update_blocks.call_args_list]
+        assert sizes == [_BATCH_UPDATE_LIMIT, 2]
+
+    def test_failed_file_upload_becomes_notice(self, mock_client):
+        """Files that fail to upload are replaced by a warning text block."""
+        sent = []
+        mock_client._batch_create = lambda d, p, blocks, index=-1: sent.extend(blocks) or ["x"] * len(blocks)
+        mock_client.get_root_folder_token = MagicMock(return_value="fld")
+        mock_client.upload_file = MagicMock(side_effect=lambda path, *a, **kw: None if "bad" in path else "ftok")
+
+        mock_client.add_blocks("doc", [
+            {"block_type": 23, "file": {"token": "/tmp/good.pdf", "name": "good.pdf"}},
+            {"block_type": 23, "file": {"token": "/tmp/bad.pdf", "name": "bad.pdf"}},
+        ])
+
+        link = sent[0]["text"]["elements"][0]["text_run"]["text_element_style"]["link"]
+        assert link["url"].endswith("/file/ftok")
+        assert sent[1]["text"]["elements"][0]["text_run"]["content"] == "⚠️ 文件上传失败: bad.pdf"
+
+    def test_repeated_paths_uploaded_once(self, mock_client, tmp_path):
+        """A path referenced by several blocks is uploaded a single time."""
+        image_path = str(tmp_path / "logo.png")
+        mock_client._batch_create = lambda d, p, bs, index=-1: [f"id{i}" for i in range(len(bs))]
+        mock_client.get_root_folder_token = MagicMock(return_value="fld")
+        mock_client.upload_file = MagicMock(return_value="ftok")
+        mock_client.upload_image = MagicMock(return_value="itok")
+        mock_client.batch_update_blocks = MagicMock(return_value=[])
+
+        with patch("doc_sync.feishu_client._is_local_path", return_value=True):
+            mock_client.add_blocks("doc", [
+                {"block_type": 27, "image": {"token": image_path}},
+                {"block_type": 23, "file": {"token": "/tmp/a.pdf", "name": "a.pdf"}},
+                {"block_type": 27, "image": {"token": image_path}},
+                {"block_type": 23, "file": {"token": "/tmp/a.pdf", "name": "a.pdf"}},
+            ])
+
+        mock_client.upload_file.assert_called_once()
+        mock_client.upload_image.assert_called_once()
+        swaps = mock_client.batch_update_blocks.call_args.args[1]
+        assert [(u["block_id"], u["replace_image"]["token"]) for u in swaps] == [("id0", "itok"), ("id2", "itok")]
+
+    def test_add_blocks_does_not_mutate_input(self, mock_client, tmp_path):
+        """Media tokens and children of the caller's blocks are left intact."""
+        image_path = str(tmp_path / "a.png")
+        blocks = [
+            {"block_type": 27, "image": {"token": image_path}},
+            {"block_type": 23, "file": {"token": "/tmp/a.pdf", "name": "a.pdf"}},
+            _text("p", children=[_text("c")]),
+        ]
+        snapshot = json.loads(json.dumps(blocks))
+        mock_client._batch_create = lambda d, p, bs, index=-1: [f"id{i}" for i in range(len(bs))]
+        mock_client.get_root_folder_token = MagicMock(return_value="fld")
+        mock_client.upload_file = MagicMock(return_value="ftok")
+        mock_client.upload_image = MagicMock(return_value="itok")
+        mock_client.update_block_image = MagicMock(return_value=True)
+
+        mock_client.add_blocks("doc", blocks)
+
+        assert blocks == snapshot
+
+    @pytest.mark.parametrize("token,expected", [
+        ("/abs/a.png", True), ("boxcnAbCdEfGhIjKlMnOpQrSt", False), ("", False), (None, False),
+    ])
+    def test_local_path_detection(self, token, expected):
+        """Only path-like tokens count as local media; Feishu tokens skip the stat."""
+        from doc_sync.feishu_client import _is_local_path
+
+        with patch("doc_sync.feishu_client.os.path.exists", return_value=True) as exists:
+            assert _is_local_path(token) is expected
+
+        exists.assert_not_called()
+
+    def test_relative_path_checked_on_disk(self, tmp_path, monkeypatch):
+        """Relative paths are local only if the file exists."""
+        from doc_sync.feishu_client import _is_local_path
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "pic.png").write_bytes(b"x")
+
+        assert _is_local_path("pic.png") is True
+        assert _is_local_path("missing.png") is False
+
+    def test_upload_pool_shared_and_closed(self, mock_client):
+        """Uploads reuse one bounded pool until the client is closed."""
+        mock_client._http = MagicMock()
+
+        assert mock_client._map_concurrently(lambda x: x * 2, [1, 2, 3]) == [2, 4, 6]
+        pool = mock_client._media_executor
+        mock_client._map_concurrently(str, [1, 2])
+        assert mock_client._media_executor is pool
+
+        mock_client.close()
+
+        assert mock_client._media_executor is None
+        mock_client._http.close.assert_called_once()
+
+
+class TestCleanBlock:
+    """Test payload cleaning before batch creation."""
+
+    def test_file_block_becomes_text_link(self, mock_client):
+        """File blocks are sent as a text link with an extension icon."""
+        block = {"block_type": 23, "file": {"token": "tok123", "name": "Report.PDF"}}
+
+        cleaned = mock_client._clean_block(block)
+
+        run = cleaned["text"]["elements"][0]["text_run"]
+        assert cleaned["block_type"] == 2
+        assert run["content"] == "📑 Report.PDF"
+        assert run["text_element_style"]["link"]["url"] == "https://www.feishu.cn/file/tok123"
+
+    @pytest.mark.parametrize("name,icon", [
+        ("a.zip", "📦"), ("b.7z", "📦"), ("c.MKV", "🎬"), ("d.txt", "📄"), ("noext", "📄"),
+    ])
+    def test_file_icons(self, mock_client, name, icon):
+        """Icons are chosen by extension, case-insensitively."""
+        cleaned = mock_client._clean_block({"block_type": 23, "file": {"token": "t", "name": name}})
+
+        assert cleaned["text"]["elements"][0]["text_run"]["content"] == f"{icon} {name}"
+
+    def test_image_block_keeps_only_token(self, mock_client):
+        """Image payloads keep the token and drop everything else."""
+        cleaned = mock_client._clean_block({"block_type": 27, "image": {"token": "img", "width": 100}})
+        empty = mock_client._clean_block({"block_type": 27, "image": {"token": ""}, "children": [1]})
+
+        assert cleaned["image"] == {"token": "img"}
+        assert empty["image"] == {}
+        assert "children" not in empty
+
+    def test_ordered_block_gets_elements(self, mock_client):
+        """Ordered list blocks always carry an elements list."""
+        cleaned = mock_client._clean_block({"block_type": 13})
+
+        assert cleaned["ordered"] == {"elements": []}
+
+    def test_empty_styles_removed(self, mock_client):
+        """Falsy styles and links without a URL are dropped."""
+        block = {"block_type": 2, "text": {"elements": [
+            {"text_run": {"content": "a", "text_element_style": {"bold": False}}},
+            {"text_run": {"content": "b", "text_element_style": {"link": {"url": ""}}}},
+            {"text_run": {"content": "c", "text_element_style": {"bold": True, "link": {}}}},
+        ]}}
+
+        runs = [e["text_run"] for e in mock_client._clean_block(block)["text"]["elements"]]
+
+        assert "text_element_style" not in runs[0]
+        assert "text_element_style" not in runs[1]
+        assert runs[2]["text_element_style"] == {"bold": True}
+
+    def test_does_not_mutate_input(self, mock_client):
+        """Style cleanup works on copies of the caller's block."""
+        block = {"block_type": 2, "text": {"elements": [
+            {"text_run": {"content": "a", "text_element_style": {"bold": False}}},
+        ]}}
+
+        mock_client._clean_block(block)
+
+        assert block["text"]["elements"][0]["text_run"]["text_element_style"] == {"bold": False}
+
+    def test_clean_blocks_pass_through(self, mock_client):
+        """Blocks that need no cleaning are returned as-is."""
+        block = {"block_type": 2, "text": {"elements": [
+            {"text_run": {"content": "a", "text_element_style": {"bold": True}}},
+            {"text_run": {"content": "b"}},
+        ]}}
+
+        assert mock_client._clean_block(block) is block
+
+
+def _created(*ids):
+    resp = MagicMock()
+    resp.status_code = 200
+    resp.content = json.dumps({"code": 0, "data": {"children": [{"block_id": i} for i in ids]}}).encode()
+    return resp
+
+
+class TestBatchCreate:
+    """Test _batch_create HTTP handling."""
+
+    def test_chunks_posted_over_shared_session(self, mock_client):
+        """All chunks go through the client's pooled session."""
+        mock_client._get_tenant_access_token = MagicMock(return_value="t")
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = [_created(*range(10)), _created(10, 11)]
+        blocks = [_text(str(i)) for i in range(12)]
+
+        with patch("doc_sync.feishu_client.time.sleep"), patch.object(mock_client, "_rate_limit"):
+            ids = mock_client._batch_create("doc", "parent", blocks, index=2)
+
+        assert ids == list(range(12))
+        bodies = [json.loads(c.kwargs["data"]) for c in mock_client._http.post.call_args_list]
+        assert [len(b["children"]) for b in bodies] == [10, 2]
+        assert [b["index"] for b in bodies] == [2, 12]
+
+    def test_session_is_pooled(self, mock_client):
+        """The HTTPS adapter keeps a connection pool and does not retry itself."""
+        adapter = mock_client._http.get_adapter("https://open.feishu.cn")
+
+        assert adapter.max_retries.total == 0
+        assert adapter._pool_maxsize >= 1
+
+    @pytest.mark.parametrize("headers,expected_sleep", [({"Retry-After": "5"}, 5.0), ({}, 1.0)])
+    def test_rate_limit_honors_retry_after(self, mock_client, headers, expected_sleep):
+        """429 waits for Retry-After when given, else the base backoff."""
+        limited = MagicMock(status_code=429, headers=headers)
+        mock_client._get_tenant_access_token = MagicMock(return_value="t")
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = [limited, _created("a")]
+
+        with patch("doc_sync.feishu_client.time.sleep") as sleep, \
+                patch("doc_sync.core.retry.random.uniform", return_value=0.0), \
+                patch.object(mock_client, "_rate_limit") as rate_limit:
+            ids = mock_client._batch_create("doc", "parent", [_text("x")])
+
+        assert ids == ["a"]
+        sleep.assert_called_once_with(expected_sleep)
+        first, retried = [c.kwargs["data"] for c in mock_client._http.post.call_args_list]
+        assert retried is first  # encoded once, resent as-is
+        rate_limit.assert_called_once()  # the backoff paces the retry
+
+    @pytest.mark.parametrize("failure", [
+        MagicMock(status_code=503, headers={}),
+        requests.ConnectionError("reset"),
+    ])
+    def test_transient_failure_retried_with_same_client_token(self, mock_client, failure):
+        """5xx and dropped connections are retried idempotently."""
+        mock_client._get_tenant_access_token = MagicMock(return_value="t")
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = [failure, _created("a")]
+
+        with patch("doc_sync.feishu_client.time.sleep") as sleep, \
+                patch.object(mock_client, "_rate_limit"):
+            ids = mock_client._batch_create("doc", "parent", [_text("x")])
+
+        assert ids == ["a"]
+        sleep.assert_called_once()
+        first, retried = [c.kwargs["params"] for c in mock_client._http.post.call_args_list]
+        assert first["client_token"] and retried == first
+
+    def test_transient_failure_gives_up_after_max_retries(self, mock_client):
+        """A persistent 5xx drops the chunk after API_MAX_RETRIES attempts."""
+        mock_client._get_tenant_access_token = MagicMock(return_value="t")
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = MagicMock(status_code=502, headers={}, content=b"")
+
+        with patch("doc_sync.feishu_client.time.sleep"), patch.object(mock_client, "_rate_limit"):
+            ids = mock_client._batch_create("doc", "parent", [_text("x")])
+
+        assert ids == []
+        assert mock_client._http.post.call_count == API_MAX_RETRIES
+
+    @pytest.mark.parametrize("code", [99991400, 1254290])
+    def test_rate_limit_code_retried_for_any_status(self, mock_client, code):
+        """A rate-limit code in the body triggers a retry even on a non-200 status."""
+        limited = MagicMock(status_code=400, headers={},
+                            content=b'{"code": %d, "msg": "limit"}' % code)
+        failed = MagicMock(status_code=400, headers={}, content=b'{"code": 1770001, "msg": "bad"}')
+        mock_client._get_tenant_access_token = MagicMock(return_value="t")
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = [limited, failed]
+
+        with patch("doc_sync.feishu_client.time.sleep"), patch.object(mock_client, "_rate_limit"):
+            ids = mock_client._batch_create("doc", "parent", [_text("x")])
+
+        assert ids == []
+        assert mock_client._http.post.call_count == 2
+
+
+class TestCreateTable:
+    """Test native table descendants construction."""
+
+    def test_descendants_structure(self, mock_client):
+        """Table, cell and text descendants are linked by unique IDs."""
+        mock_client._create_descendants = MagicMock(return_value=True)
+        table = {
+            "block_type": 31,
+            "table": {"property": {"row_size": 1, "column_size": 2}},
+            "children": [
+                {"children": [_text("a")]},
+                {"children": [_text("b"), _text("c")]},
+            ],
+        }
+
+        assert mock_client.create_table("doc", table, index=1) is True
+
+        _, parent, top_ids, descendants, index = mock_client._create_descendants.call_args.args
+        by_id = {d["block_id"]: d for d in descendants}
+        table_desc = descendants[0]
+        assert (parent, index) == ("doc", 1)
+        assert top_ids == [table_desc["block_id"]] and table_desc["block_id"].startswith("table_")
+        assert len(by_id) == len(descendants) == 6
+        cells = [by_id[c] for c in table_desc["children"]]
+        assert [c["block_type"] for c in cells] == [32, 32]
+        texts = [[by_id[t]["text"]["elements"][0]["text_run"]["content"] for t in c["children"]] for c in cells]
+        assert texts == [["a"], ["b", "c"]]
+
+    def test_empty_cells_have_no_text_descendants(self, mock_client):
+        """Cells whose text is empty are sent without text children."""
+        mock_client._create_descendants = MagicMock(return_value=True)
+        table = {
+            "block_type": 31,
+            "table": {"property": {"row_size": 1, "column_size": 3}},
+            "children": [{"children": [_text("")]}, {"children": []}, {"children": [_text(""), _text("x")]}],
+        }
+
+        mock_client.create_table("doc", table)
+
+        descendants = mock_client._create_descendants.call_args.args[3]
+        cells = [d for d in descendants if d["block_type"] == 32]
+        assert [len(c["children"]) for c in cells] == [0, 0, 2]
+        assert len(descendants) == 1 + 3 + 2
+
+
+class TestAssetsFolder:
+    """Test assets folder resolution."""
+
+    def test_resolved_once_per_client(self, mock_client):
+        """The assets folder token is looked up once and then cached."""
+        mock_client._resolve_assets_folder = MagicMock(return_value="fld")
+
+        assert mock_client.get_root_folder_token() == "fld"
+        assert mock_client.get_or_create_assets_folder() == "fld"
+        mock_client._resolve_assets_folder.assert_called_once()
+
+    def test_configured_token_wins(self, mock_client):
+        """A configured assets token is used without any API call."""
+        mock_client._http = MagicMock()
+
+        with patch("doc_sync.config.FEISHU_ASSETS_TOKEN", "cfg_fld"):
+            assert mock_client.get_or_create_assets_folder() == "cfg_fld"
+
+        mock_client._http.get.assert_not_called()
+
+    def test_failure_not_cached(self, mock_client):
+        """A failed lookup is retried on the next call."""
+        mock_client._resolve_assets_folder = MagicMock(side_effect=[None, "fld"])
+
+        assert mock_client.get_or_create_assets_folder() is None
+        assert mock_client.get_or_create_assets_folder() == "fld"
+
+    def test_discovered_folder_persisted_across_clients(self, mock_client, tmp_path):
+        """A later client reuses the folder found by an earlier one."""
+        mock_client.assets_folder_path = str(tmp_path / "assets_folder.json")
+        mock_client._discover_assets_folder = MagicMock(return_value="fld")
+
+        with patch("doc_sync.config.FEISHU_ASSETS_TOKEN", None):
+            assert mock_client.get_or_create_assets_folder() == "fld"
+            mock_client._assets_folder_token = None  # as in a fresh client
+            assert mock_client.get_or_create_assets_folder() == "fld"
+
+        mock_client._discover_assets_folder.assert_called_once()
+
+    def test_gone_folder_forgotten(self, mock_client, tmp_path):
+        """An upload reporting the folder gone drops it from memory and disk."""
+        mock_client.assets_folder_path = str(tmp_path / "assets_folder.json")
+        mock_client._discover_assets_folder = MagicMock(side_effect=["old", "new"])
+
+        with patch("doc_sync.config.FEISHU_ASSETS_TOKEN", None):
+            assert mock_client.get_or_create_assets_folder() == "old"
+            mock_client._forget_upload_folder("old")
+            assert mock_client.get_or_create_assets_folder() == "new"
+
+        assert mock_client._load_assets_folders() == {"test_id:user": "new"}
@@ -1,15 +1,22 @@
 """Tests for block update functionality."""
+import json
+
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 
 
+def _json_body(data):
+    """Encode a response body the way the API sends it."""
+    return json.dumps(data).encode("utf-8")
+
+
 class TestUpdateBlockText:
     """Test update_block_text method."""
     
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
             
@@ -128,9 +135,30 @@ class TestUpdateBlockText:
         ]
         
         result = mock_client.update_block_text("doc123", "block456", elements)
-        
+
         assert result is True
-    
+
+    def test_update_request_payload(self, mock_client):
+        """Test the request body carries typed SDK elements and styles."""
+        mock_response = Mock()
+        mock_response.success.return_value = True
+        mock_client.client.docx.v1.document_block.patch.return_value = mock_response
+
+        elements = [
+            {"text_run": {"content": "Bold", "text_element_style": {"bold": True, "italic": False, "text_color": 2}}},
+            {"mention_user": {"user_id": "ou_xxx123"}}
+        ]
+
+        mock_client.update_block_text("doc123", "block456", elements)
+
+        request = mock_client.client.docx.v1.document_block.patch.call_args[0][0]
+        sent = request.request_body.update_text_elements.elements
+        assert sent[0].text_run.content == "Bold"
+        assert sent[0].text_run.text_element_style.bold is True
+        assert sent[0].text_run.text_element_style.italic is None
+        assert sent[0].text_run.text_element_style.text_color == 2
+        assert sent[1].mention_user.user_id == "ou_xxx123"
+
     def test_update_failure(self, mock_client):
         """Test handling of API failure."""
         mock_response = Mock()
@@ -162,10 +190,9 @@ class TestGetBlock:
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
-            mock_lark.JSON.marshal.return_value = '{"block_type": 2, "text": {"elements": []}}'
             
             from doc_sync.feishu_client import FeishuClient
             client = FeishuClient("test_id", "test_secret", "test_token")
@@ -174,21 +201,43 @@ class TestGetBlock:
     
     def test_get_block_success(self, mock_client):
         """Test successful block retrieval."""
+        from lark_oapi.api.docx.v1.model import Block
+
         mock_response = Mock()
         mock_response.success.return_value = True
-        mock_response.data.block = Mock()
+        mock_response.data.block = Block({
+            "block_type": 2,
+            "text": {"elements": [{"text_run": {"content": "Hello"}}]}
+        })
         mock_client.client.docx.v1.document_block.get.return_value = mock_response
         
-        # Patch lark in the module where it's actually used
-        with patch('doc_sync.feishu.blocks.lark') as mock_lark:
-            mock_lark.JSON.marshal.return_value = '{"block_type": 2, "text": {"elements": [{"text_run": {"content": "Hello"}}]}}'
-            
-            result = mock_client.get_block("doc123", "block456")
+        result = mock_client.get_block("doc123", "block456")
         
         assert result is not None
         assert result["block_type"] == 2
         mock_client.client.docx.v1.document_block.get.assert_called_once()
     
+    def test_get_block_sdk_model_matches_marshal(self, mock_client):
+        """SDK models are converted directly, matching the JSON round-trip."""
+        import json
+        import lark_oapi as lark
+        from lark_oapi.api.docx.v1.model import Block
+
+        block = Block({
+            "block_id": "block456",
+            "block_type": 2,
+            "text": {"elements": [{"text_run": {"content": "Hi", "text_element_style": {"bold": True}}}]}
+        })
+        mock_response = Mock()
+        mock_response.success.return_value = True
+        mock_response.data.block = block
+        mock_client.client.docx.v1.document_block.get.return_value = mock_response
+
+        result = mock_client.get_block("doc123", "block456")
+
+        assert result == json.loads(lark.JSON.marshal(block))
+        assert result["text"]["elements"][0]["text_run"]["text_element_style"] == {"bold": True}
+
     def test_get_block_failure(self, mock_client):
         """Test handling of API failure."""
         mock_response = Mock()
@@ -201,6 +250,16 @@ class TestGetBlock:
         
         assert result is None
 
+    def test_count_children_single_get(self, mock_client):
+        """count_children reads the child IDs of one block; page by default."""
+        mock_client.get_block = MagicMock(return_value={"block_id": "doc123", "children": ["a", "b"]})
+
+        assert mock_client.count_children("doc123") == 2
+        mock_client.get_block.assert_called_once_with("doc123", "doc123")
+
+        mock_client.get_block.return_value = None
+        assert mock_client.count_children("doc123", "blk") is None
+
 
 class TestBatchUpdateBlocks:
     """Test batch_update_blocks method."""
@@ -208,7 +267,7 @@ class TestBatchUpdateBlocks:
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
             
@@ -219,13 +278,13 @@ class TestBatchUpdateBlocks:
     
     def test_batch_update_text_elements(self, mock_client):
         """Test batch updating text elements."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {"blocks": [{"block_id": "block1"}, {"block_id": "block2"}]}
-            }
+            })
             mock_requests.patch.return_value = mock_response
             
             requests = [
@@ -250,13 +309,13 @@ class TestBatchUpdateBlocks:
     
     def test_batch_update_text_style(self, mock_client):
         """Test batch updating text styles."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {"blocks": [{"block_id": "block1"}]}
-            }
+            })
             mock_requests.patch.return_value = mock_response
             
             requests = [
@@ -275,13 +334,13 @@ class TestBatchUpdateBlocks:
     
     def test_batch_update_table_operations(self, mock_client):
         """Test batch updating with table operations."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {"blocks": [{"block_id": "table1"}]}
-            }
+            })
             mock_requests.patch.return_value = mock_response
             
             requests = [
@@ -302,13 +361,13 @@ class TestBatchUpdateBlocks:
     
     def test_batch_update_failure(self, mock_client):
         """Test handling of batch update failure."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 500,
                 "msg": "Internal error"
-            }
+            })
             mock_requests.patch.return_value = mock_response
             
             result = mock_client.batch_update_blocks("doc123", [])
@@ -317,25 +376,48 @@ class TestBatchUpdateBlocks:
     
     def test_batch_update_rate_limit_retry(self, mock_client):
         """Test batch update retries on rate limit."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             # First call returns rate limit, second succeeds
             mock_response_429 = Mock()
             mock_response_429.status_code = 429
             
             mock_response_ok = Mock()
             mock_response_ok.status_code = 200
-            mock_response_ok.json.return_value = {
+            mock_response_ok.content = _json_body({
                 "code": 0,
                 "data": {"blocks": [{"block_id": "block1"}]}
-            }
+            })
             
             mock_requests.patch.side_effect = [mock_response_429, mock_response_ok]
             
-            result = mock_client.batch_update_blocks("doc123", [{"block_id": "block1"}])
+            with patch('doc_sync.feishu_client.time.sleep'):
+                result = mock_client.batch_update_blocks("doc123", [{"block_id": "block1"}])
             
             # Should succeed after retry
             assert result is not None
 
+    @pytest.mark.parametrize("failure", [
+        Mock(status_code=503, headers={}),
+        Mock(status_code=502, headers={}, content=b"<html>502 Bad Gateway</html>"),
+        Mock(status_code=200, headers={}, content=b"<html>"),
+        Mock(status_code=400, headers={"Retry-After": "2"},
+             content=_json_body({"code": 99991400, "msg": "limit"})),
+    ])
+    def test_batch_update_transient_retry_with_backoff(self, mock_client, failure):
+        """5xx, unparseable bodies and rate-limit codes are retried, honoring Retry-After."""
+        ok = Mock(status_code=200)
+        ok.content = _json_body({"code": 0, "data": {"blocks": []}})
+        mock_client._http = MagicMock()
+        mock_client._http.patch.side_effect = [failure, ok]
+
+        with patch('doc_sync.feishu_client.time.sleep') as sleep, \
+                patch('doc_sync.core.retry.random.uniform', return_value=0.0), \
+                patch.object(mock_client, '_rate_limit'):
+            assert mock_client.batch_update_blocks("doc123", [{"block_id": "b"}]) == []
+
+        assert mock_client._http.patch.call_count == 2
+        sleep.assert_called_once_with(2.0 if failure.headers else 1.0)
+
 
 class TestGetBlockChildren:
     """Test get_block_children method."""
@@ -343,7 +425,7 @@ class TestGetBlockChildren:
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
             
@@ -354,7 +436,7 @@ class TestGetBlockChildren:
     
     def test_get_children_success(self, mock_client):
         """Test successful retrieval of child blocks."""
-        with patch('doc_sync.feishu.blocks.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -376,7 +458,7 @@ class TestGetBlockChildren:
     
     def test_get_children_with_descendants(self, mock_client):
         """Test retrieval with descendants flag."""
-        with patch('doc_sync.feishu.blocks.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -400,10 +482,11 @@ class TestGetBlockChildren:
             assert len(result) == 4
             # Verify params include with_descendants
             mock_requests.get.assert_called_once()
+            assert mock_requests.get.call_args.kwargs["params"]["with_descendants"] == "true"
     
     def test_get_children_pagination(self, mock_client):
         """Test pagination handling."""
-        with patch('doc_sync.feishu.blocks.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             # First page with page_token
             page1_response = Mock()
             page1_response.status_code = 200
@@ -433,9 +516,25 @@ class TestGetBlockChildren:
             assert len(result) == 2
             assert mock_requests.get.call_count == 2
     
+    def test_get_children_stops_when_has_more_false(self, mock_client):
+        """A page_token without has_more does not trigger another request."""
+        with patch.object(mock_client, '_http') as mock_requests:
+            last_page = Mock()
+            last_page.status_code = 200
+            last_page.json.return_value = {
+                "code": 0,
+                "data": {"items": [{"block_id": "block1"}], "page_token": "stale", "has_more": False}
+            }
+            mock_requests.get.return_value = last_page
+            
+            result = mock_client.get_block_children("doc123", "doc123")
+            
+            assert len(result) == 1
+            assert mock_requests.get.call_count == 1
+    
     def test_get_children_failure(self, mock_client):
         """Test handling of API failure."""
-        with patch('doc_sync.feishu.blocks.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -450,7 +549,7 @@ class TestGetBlockChildren:
     
     def test_get_children_rate_limit_retry(self, mock_client):
         """Test rate limit retry logic."""
-        with patch('doc_sync.feishu.blocks.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             # First call returns rate limit error in body, second succeeds
             mock_response_limited = Mock()
             mock_response_limited.status_code = 200
@@ -480,7 +579,7 @@ class TestDeleteBlockChildren:
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
             
@@ -553,7 +652,7 @@ class TestConvertContentToBlocks:
     @pytest.fixture
     def mock_client(self):
         """Create a mock FeishuClient."""
-        with patch('doc_sync.feishu_client.lark') as mock_lark:
+        with patch('doc_sync.feishu.base.lark') as mock_lark:
             mock_lark_client = MagicMock()
             mock_lark.Client.builder.return_value.app_id.return_value.app_secret.return_value.enable_set_token.return_value.log_level.return_value.build.return_value = mock_lark_client
             
@@ -564,10 +663,10 @@ class TestConvertContentToBlocks:
     
     def test_convert_markdown_success(self, mock_client):
         """Test successful Markdown conversion."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {
                     "first_level_block_ids": ["block1", "block2"],
@@ -576,7 +675,7 @@ class TestConvertContentToBlocks:
                         {"block_id": "block2", "block_type": 2, "text": {}}
                     ]
                 }
-            }
+            })
             mock_requests.post.return_value = mock_response
             
             result = mock_client.convert_content_to_blocks("# Hello\n\nWorld")
@@ -587,16 +686,16 @@ class TestConvertContentToBlocks:
     
     def test_convert_html_content(self, mock_client):
         """Test HTML content conversion."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {
                     "first_level_block_ids": ["block1"],
                     "blocks": [{"block_id": "block1", "block_type": 2}]
                 }
-            }
+            })
             mock_requests.post.return_value = mock_response
             
             result = mock_client.convert_content_to_blocks(
@@ -606,13 +705,15 @@ class TestConvertContentToBlocks:
             
             assert result is not None
             mock_requests.post.assert_called_once()
+            sent = json.loads(mock_requests.post.call_args.kwargs["data"])
+            assert sent == {"content_type": "html", "content": "<p>Hello <strong>World</strong></p>"}
     
     def test_convert_with_table(self, mock_client):
         """Test conversion with table content."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 0,
                 "data": {
                     "first_level_block_ids": ["table1"],
@@ -621,7 +722,7 @@ class TestConvertContentToBlocks:
                         {"block_id": "cell1", "block_type": 32}
                     ]
                 }
-            }
+            })
             mock_requests.post.return_value = mock_response
             
             result = mock_client.convert_content_to_blocks("|A|B|\n|--|--|\n|1|2|")
@@ -631,13 +732,13 @@ class TestConvertContentToBlocks:
     
     def test_convert_failure(self, mock_client):
         """Test handling of conversion failure."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
+            mock_response.content = _json_body({
                 "code": 1770001,
                 "msg": "invalid param"
-            }
+            })
             mock_requests.post.return_value = mock_response
             
             result = mock_client.convert_content_to_blocks("")
@@ -646,22 +747,43 @@ class TestConvertContentToBlocks:
     
     def test_convert_rate_limit_retry(self, mock_client):
         """Test rate limit retry logic."""
-        with patch('doc_sync.feishu_client.requests_module') as mock_requests:
+        with patch.object(mock_client, '_http') as mock_requests:
             mock_response_429 = Mock()
             mock_response_429.status_code = 429
             
             mock_response_ok = Mock()
             mock_response_ok.status_code = 200
-            mock_response_ok.json.return_value = {
+            mock_response_ok.content = _json_body({
                 "code": 0,
                 "data": {
                     "first_level_block_ids": ["block1"],
                     "blocks": [{"block_id": "block1"}]
                 }
-            }
+            })
             
             mock_requests.post.side_effect = [mock_response_429, mock_response_ok]
             
-            result = mock_client.convert_content_to_blocks("# Test")
+            with patch('doc_sync.feishu_client.time.sleep'):
+                result = mock_client.convert_content_to_blocks("# Test")
             
             assert result is not None
+
+    @pytest.mark.parametrize("failure", [
+        Mock(status_code=502, headers={}, content=b"<html>502 Bad Gateway</html>"),
+        Mock(status_code=200, headers={}, content=b""),
+        Mock(status_code=400, headers={"retry-after": "2"},
+             content=_json_body({"code": 1254290, "msg": "limit"})),
+    ])
+    def test_convert_transient_failure_retried(self, mock_client, failure):
+        """5xx, unparseable bodies and any rate-limit code are retried with backoff."""
+        ok = Mock(status_code=200, content=_json_body({"code": 0, "data": {"blocks": []}}))
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = [failure, ok]
+
+        with patch('doc_sync.feishu_client.time.sleep') as sleep, \
+                patch('doc_sync.core.retry.random.uniform', return_value=0.0), \
+                patch.object(mock_client, '_rate_limit'):
+            result = mock_client.convert_content_to_blocks("# Test")
+
+        assert result == {"first_level_block_ids": [], "blocks": []}
+        sleep.assert_called_once_with(2.0 if failure.headers else 1.0)
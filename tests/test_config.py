@@ -0,0 +1,66 @@
+"""Tests for loading optional settings from sync_config.json."""
+import json
+
+import pytest
+
+from doc_sync import config
+
+
+@pytest.fixture
+def write_config(tmp_path, monkeypatch):
+    """Write a sync_config.json and point config at it."""
+    path = tmp_path / "sync_config.json"
+    monkeypatch.setattr(config, "CONFIG_FILE", str(path))
+    monkeypatch.setattr(config, "USE_KEYRING", False)
+    # Restore every global load_config_from_json may assign
+    for name in ("FEISHU_APP_ID", "FEISHU_APP_SECRET", "FEISHU_ASSETS_TOKEN",
+                 "FEISHU_USER_ACCESS_TOKEN", "FEISHU_USER_REFRESH_TOKEN",
+                 "API_REQUESTS_PER_SECOND", "API_RATE_LIMIT_BURST", "API_GZIP_MIN_BYTES"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+
+    def write(**data):
+        path.write_text(json.dumps(data), encoding="utf-8")
+    return write
+
+
+class TestOptionalSettings:
+    """Test the optional API tuning keys."""
+
+    def test_gzip_threshold_override(self, write_config):
+        """api_gzip_min_bytes enables request body compression."""
+        write_config(api_gzip_min_bytes=4096)
+
+        config.load_config_from_json()
+
+        assert config.API_GZIP_MIN_BYTES == 4096
+
+    def test_defaults_kept_when_absent(self, write_config):
+        """Missing keys leave the built-in defaults in place."""
+        write_config(feishu_app_id="cli_x")
+        defaults = (config.API_REQUESTS_PER_SECOND, config.API_GZIP_MIN_BYTES)
+
+        config.load_config_from_json()
+
+        assert (config.API_REQUESTS_PER_SECOND, config.API_GZIP_MIN_BYTES) == defaults
+
+    @pytest.mark.parametrize("rate", [0, -2])
+    def test_non_positive_rate_falls_back_to_default(self, write_config, capsys, rate):
+        """A zero or negative rate keeps the default and warns."""
+        write_config(api_requests_per_second=rate)
+        default = config.API_REQUESTS_PER_SECOND
+
+        config.load_config_from_json()
+
+        assert config.API_REQUESTS_PER_SECOND == default
+        assert "api_requests_per_second" in capsys.readouterr().out
+
+    @pytest.mark.parametrize("burst", [0, -3])
+    def test_burst_below_one_falls_back_to_default(self, write_config, capsys, burst):
+        """A burst below 1 keeps the default and warns."""
+        write_config(api_rate_limit_burst=burst)
+        default = config.API_RATE_LIMIT_BURST
+
+        config.load_config_from_json()
+
+        assert config.API_RATE_LIMIT_BURST == default
+        assert "api_rate_limit_burst" in capsys.readouterr().out
@@ -0,0 +1,175 @@
+"""Tests for document operations (listing, pagination)."""
+from unittest.mock import MagicMock, Mock, patch
+
+
+def _page(items_attr, items, token=None, has_more=False, token_attr="page_token"):
+    """Build a successful SDK list response page."""
+    resp = Mock()
+    resp.success.return_value = True
+    resp.data = Mock()
+    setattr(resp.data, items_attr, items)
+    setattr(resp.data, token_attr, token)
+    resp.data.has_more = has_more
+    return resp
+
+
+class TestListDocumentBlocks:
+    """Test list_document_blocks pagination."""
+
+    def test_follows_page_token_while_has_more(self, mock_client):
+        """Pages are fetched until has_more is false."""
+        mock_client.client.docx.v1.document_block.list.side_effect = [
+            _page("items", ["b1", "b2"], token="p2", has_more=True),
+            _page("items", ["b3"], token=None, has_more=False),
+        ]
+
+        result = mock_client.list_document_blocks("doc123")
+
+        assert result == ["b1", "b2", "b3"]
+        assert mock_client.client.docx.v1.document_block.list.call_count == 2
+
+    def test_stops_when_has_more_false_despite_token(self, mock_client):
+        """A trailing page_token without has_more does not trigger another request."""
+        mock_client.client.docx.v1.document_block.list.return_value = _page(
+            "items", ["b1"], token="stale", has_more=False
+        )
+
+        result = mock_client.list_document_blocks("doc123")
+
+        assert result == ["b1"]
+        assert mock_client.client.docx.v1.document_block.list.call_count == 1
+
+
+class TestListFolderFiles:
+    """Test list_folder_files pagination."""
+
+    def test_follows_next_page_token(self, mock_client):
+        """Drive pagination uses next_page_token."""
+        mock_client.client.drive.v1.file.list.side_effect = [
+            _page("files", ["f1"], token="p2", has_more=True, token_attr="next_page_token"),
+            _page("files", ["f2"], token=None, has_more=False, token_attr="next_page_token"),
+        ]
+
+        result = mock_client.list_folder_files("fld123")
+
+        assert result == ["f1", "f2"]
+        assert mock_client.client.drive.v1.file.list.call_count == 2
+
+    def test_failure_returns_collected_files(self, mock_client):
+        """A failed page returns what was collected so far."""
+        failed = Mock()
+        failed.success.return_value = False
+        mock_client.client.drive.v1.file.list.side_effect = [
+            _page("files", ["f1"], token="p2", has_more=True, token_attr="next_page_token"),
+            failed,
+        ]
+
+        result = mock_client.list_folder_files("fld123")
+
+        assert result == ["f1"]
+
+    def test_stop_when_ends_paging_early(self, mock_client):
+        """Paging stops after the page holding the first match."""
+        mock_client.client.drive.v1.file.list.side_effect = [
+            _page("files", ["f1", "target"], token="p2", has_more=True, token_attr="next_page_token"),
+            _page("files", ["f3"], token=None, has_more=False, token_attr="next_page_token"),
+        ]
+
+        result = mock_client.list_folder_files("fld123", stop_when=lambda f: f == "target")
+
+        assert result == ["f1", "target"]
+        assert mock_client.client.drive.v1.file.list.call_count == 1
+
+
+class TestGetFileInfos:
+    """Test batched drive meta queries."""
+
+    @staticmethod
+    def _metas(request, option):
+        docs = request.request_body.request_docs
+        resp = Mock()
+        resp.success.return_value = True
+        resp.data.metas = [Mock(doc_token=d.doc_token) for d in docs if d.doc_token != "gone"]
+        return resp
+
+    def test_batches_and_maps_by_token(self, mock_client):
+        """Tokens are deduplicated and queried META_BATCH_SIZE per call."""
+        from doc_sync.feishu.documents import META_BATCH_SIZE
+
+        tokens = [f"t{i}" for i in range(META_BATCH_SIZE + 1)] + ["t0", "gone"]
+        mock_client.client.drive.v1.meta.batch_query.side_effect = self._metas
+
+        with patch.object(mock_client, "_rate_limit"):
+            metas = mock_client.get_file_infos(tokens, obj_type="file")
+
+        calls = mock_client.client.drive.v1.meta.batch_query.call_args_list
+        assert [len(c.args[0].request_body.request_docs) for c in calls] == [META_BATCH_SIZE, 2]
+        assert set(metas) == set(tokens) - {"gone"}
+        assert calls[0].args[0].request_body.request_docs[0].doc_type == "file"
+
+    def test_single_lookup_delegates(self, mock_client):
+        """get_file_info returns the meta or None."""
+        mock_client.client.drive.v1.meta.batch_query.side_effect = self._metas
+
+        with patch.object(mock_client, "_rate_limit"):
+            assert mock_client.get_file_info("abc").doc_token == "abc"
+            assert mock_client.get_file_info("gone") is None
+
+
+class TestClearDocument:
+    """Test clear_document."""
+
+    def test_deletes_page_children_without_listing(self, mock_client):
+        """The child count comes from the page block alone."""
+        mock_client.get_block = MagicMock(return_value={"block_id": "doc123", "children": ["a", "b", "c"]})
+        mock_client.get_all_blocks = MagicMock()
+        mock_client.client.docx.v1.document_block_children.batch_delete.return_value.success.return_value = True
+
+        with patch.object(mock_client, "_rate_limit"):
+            mock_client.clear_document("doc123")
+
+        mock_client.get_block.assert_called_once_with("doc123", "doc123")
+        mock_client.get_all_blocks.assert_not_called()
+        request = mock_client.client.docx.v1.document_block_children.batch_delete.call_args.args[0]
+        assert (request.request_body.start_index, request.request_body.end_index) == (0, 3)
+
+    def test_transient_failure_not_retried(self, mock_client):
+        """A 5xx on the range delete is not resent with a stale range."""
+        mock_client.get_block = MagicMock(return_value={"block_id": "doc123", "children": ["a"]})
+        batch_delete = mock_client.client.docx.v1.document_block_children.batch_delete
+        batch_delete.return_value.success.return_value = False
+        batch_delete.return_value.code = 500
+        batch_delete.return_value.raw.status_code = 503
+
+        with patch.object(mock_client, "_rate_limit"), \
+                patch("doc_sync.core.retry.time.sleep") as sleep:
+            mock_client.clear_document("doc123")
+
+        batch_delete.assert_called_once()
+        sleep.assert_not_called()
+
+    def test_empty_document_untouched(self, mock_client):
+        """Nothing is deleted when the page has no children."""
+        mock_client.get_block = MagicMock(return_value={"block_id": "doc123"})
+
+        mock_client.clear_document("doc123")
+
+        mock_client.client.docx.v1.document_block_children.batch_delete.assert_not_called()
+
+
+class TestDeleteFile:
+    """Test delete_file."""
+
+    def test_transient_failure_not_retried(self, mock_client):
+        """A 5xx is not retried into a "not found" for an applied delete."""
+        delete = mock_client.client.drive.v1.file.delete
+        delete.return_value.success.return_value = False
+        delete.return_value.code = 500
+        delete.return_value.raw.status_code = 503
+
+        with patch.object(mock_client, "_rate_limit"), \
+                patch("doc_sync.core.retry.time.sleep") as sleep:
+            assert mock_client.delete_file("tok") is False
+
+        delete.assert_called_once()
+        sleep.assert_not_called()
@@ -0,0 +1,199 @@
+"""Tests for FeishuClientBase helpers (hashing, caching, auth)."""
+import hashlib
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+class TestCalculateFileHash:
+    """Test _calculate_file_hash."""
+
+    @pytest.mark.parametrize("size", [0, 100, 300 * 1024, (1 << 20) * 2 + 17])
+    def test_matches_sha256(self, mock_client, tmp_path, size):
+        """Small and large files hash to the plain SHA256 digest."""
+        data = os.urandom(size)
+        path = tmp_path / "asset.bin"
+        path.write_bytes(data)
+
+        assert mock_client._calculate_file_hash(str(path)) == hashlib.sha256(data).hexdigest()
+
+
+class TestAssetCacheIO:
+    """Test asset cache persistence."""
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_round_trip(self, mock_client, tmp_path, use_orjson):
+        """The cache survives a save/load cycle with or without orjson."""
+        import doc_sync.feishu.base as base
+
+        mock_client.asset_cache_path = str(tmp_path / "cache" / "assets_cache.json")
+        mock_client._asset_cache = {"abc123": "file_token_1", "图片": "file_token_2"}
+
+        orjson_module = base.orjson if use_orjson else None
+        with patch.object(base, "orjson", orjson_module):
+            mock_client._save_asset_cache()
+            loaded = mock_client._load_asset_cache()
+
+        assert loaded == {"abc123": "file_token_1", "图片": "file_token_2"}
+
+    def test_corrupt_cache_returns_empty(self, mock_client, tmp_path):
+        """A corrupt cache file is ignored."""
+        path = tmp_path / "assets_cache.json"
+        path.write_bytes(b"{not json")
+        mock_client.asset_cache_path = str(path)
+
+        assert mock_client._load_asset_cache() == {}
+
+    def test_deferred_writes_flush_once(self, mock_client, tmp_path):
+        """Saves inside a deferred block are written once on exit."""
+        mock_client.asset_cache_path = str(tmp_path / "assets_cache.json")
+
+        with patch("doc_sync.feishu.base.json_dumps", return_value=b"{}") as dumps:
+            with mock_client._deferred_cache_writes():
+                with mock_client._deferred_cache_writes():
+                    mock_client._save_asset_cache()
+                mock_client._save_asset_cache()
+                assert dumps.call_count == 0
+            assert dumps.call_count == 1
+
+            with mock_client._deferred_cache_writes():
+                pass
+            assert dumps.call_count == 1
+
+
+class TestRateLimit:
+    """Test the shared request throttle."""
+
+    def test_reserves_consecutive_slots(self, mock_client):
+        """Back-to-back calls are spaced by the interval and sleep outside the lock."""
+        from doc_sync.feishu.base import FeishuClientBase
+
+        sleeps = []
+
+        def fake_sleep(seconds):
+            assert not FeishuClientBase._rate_limit_lock.locked()
+            sleeps.append(seconds)
+
+        with patch.object(FeishuClientBase, "_rate_limit_tat", float("-inf")), \
+                patch("doc_sync.feishu.base.time.monotonic", return_value=100.0), \
+                patch("doc_sync.feishu.base.time.sleep", side_effect=fake_sleep):
+            for _ in range(3):
+                mock_client._rate_limit()
+
+        interval = FeishuClientBase._rate_limit_interval
+        assert sleeps == pytest.approx([interval, 2 * interval])
+
+    def test_burst_allows_back_to_back_requests(self, mock_client):
+        """With a burst of N, the first N requests don't wait."""
+        from doc_sync.feishu.base import FeishuClientBase
+
+        sleeps = []
+        with patch.object(FeishuClientBase, "_rate_limit_tat", float("-inf")), \
+                patch.object(FeishuClientBase, "_rate_limit_interval", 0.1), \
+                patch.object(FeishuClientBase, "_rate_limit_burst", 3):
+            with patch("doc_sync.feishu.base.time.monotonic", return_value=100.0), \
+                    patch("doc_sync.feishu.base.time.sleep", side_effect=sleeps.append):
+                for _ in range(5):
+                    mock_client._rate_limit()
+
+        assert sleeps == pytest.approx([0.1, 0.2])
+
+    def test_client_init_keeps_shared_limit(self, mock_client):
+        """Constructing a client does not reset the shared rate limit."""
+        from doc_sync.feishu.base import FeishuClientBase
+        from doc_sync.feishu_client import FeishuClient
+
+        with patch.object(FeishuClientBase, "_rate_limit_interval", 0.125), \
+                patch.object(FeishuClientBase, "_rate_limit_burst", 4):
+            FeishuClient("test_id", "test_secret", "test_token").close()
+
+            assert FeishuClientBase._rate_limit_interval == 0.125
+            assert FeishuClientBase._rate_limit_burst == 4
+
+
+class TestHttpSession:
+    """Test the pooled HTTP session lifecycle."""
+
+    def test_context_manager_closes_session(self, mock_client):
+        """Leaving the with-block closes pooled connections."""
+        mock_client._http = MagicMock()
+
+        with mock_client as client:
+            assert client is mock_client
+
+        mock_client._http.close.assert_called_once()
+
+
+class TestEncodeBody:
+    """Test optional request body compression."""
+
+    def test_disabled_by_default(self):
+        """Bodies pass through unchanged unless a threshold is configured."""
+        from doc_sync.feishu.base import encode_body
+
+        headers = {"Content-Type": "application/json"}
+        assert encode_body(b"x" * 10000, headers) == (b"x" * 10000, headers)
+
+    def test_compresses_above_threshold(self):
+        """Large bodies are gzipped and flagged; small ones are not."""
+        import gzip
+
+        from doc_sync.feishu.base import encode_body
+
+        with patch("doc_sync.config.API_GZIP_MIN_BYTES", 4096):
+            small, small_headers = encode_body(b"x" * 100, {})
+            big, big_headers = encode_body(b"x" * 10000, {"A": "1"})
+
+        assert (small, small_headers) == (b"x" * 100, {})
+        assert gzip.decompress(big) == b"x" * 10000
+        assert big_headers == {"A": "1", "Content-Encoding": "gzip"}
+
+
+class TestTenantAccessToken:
+    """Test tenant token retrieval."""
+
+    def test_fetched_over_shared_session(self, mock_client):
+        """The token request goes through the pooled session."""
+        resp = MagicMock(status_code=200, content=b'{"code": 0, "tenant_access_token": "tat", "expire": 7200}')
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = resp
+
+        with patch.object(mock_client, "_rate_limit"):
+            assert mock_client._get_tenant_access_token() == "tat"
+
+        mock_client._http.post.assert_called_once()
+
+    def test_failure_returns_none(self, mock_client):
+        """Non-zero codes yield no token."""
+        resp = MagicMock(status_code=200, content=b'{"code": 10003, "msg": "invalid app"}')
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = resp
+
+        with patch.object(mock_client, "_rate_limit"):
+            assert mock_client._get_tenant_access_token() is None
+
+    def test_token_cached_until_near_expiry(self, mock_client):
+        """Repeated calls reuse the token until the refresh margin is reached."""
+        responses = [
+            MagicMock(status_code=200, content=b'{"code": 0, "tenant_access_token": "t1", "expire": 7200}'),
+            MagicMock(status_code=200, content=b'{"code": 0, "tenant_access_token": "t2", "expire": 7200}'),
+        ]
+        mock_client._http = MagicMock()
+        mock_client._http.post.side_effect = responses
+
+        with patch.object(mock_client, "_rate_limit"), \
+                patch("doc_sync.feishu.base.time.monotonic", side_effect=[0, 6999, 7001, 7001]):
+            assert mock_client._get_tenant_access_token() == "t1"
+            assert mock_client._get_tenant_access_token() == "t1"
+            assert mock_client._get_tenant_access_token() == "t2"
+
+        assert mock_client._http.post.call_count == 2
+
+    def test_malformed_body_returns_none(self, mock_client):
+        """An unparsable response yields no token instead of raising."""
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = MagicMock(status_code=200, content=b"<html>")
+
+        with patch.object(mock_client, "_rate_limit"):
+            assert mock_client._get_tenant_access_token() is None
@@ -0,0 +1,247 @@
+"""Tests for MediaOperationsMixin uploads."""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from doc_sync.config import API_MAX_RETRIES
+
+
+@pytest.fixture
+def asset(tmp_path):
+    """A small file to upload."""
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return str(path)
+
+
+class TestPostMultipart:
+    """Test upload retries in _post_multipart."""
+
+    @pytest.mark.parametrize("failure", [
+        MagicMock(status_code=429, headers={"x-ogw-ratelimit-reset": "3"}),
+        MagicMock(status_code=503, headers={}),
+        requests.ConnectionError("reset"),
+    ])
+    def test_transient_failure_retried(self, mock_client, asset, failure):
+        """429, 5xx and dropped connections are retried with backoff."""
+        ok = MagicMock(status_code=200)
+        mock_client._http = MagicMock()
+        post = mock_client._http.post
+        post.side_effect = [failure, ok]
+
+        with patch("doc_sync.feishu.media.time.sleep") as sleep, \
+                patch("doc_sync.core.retry.random.uniform", return_value=0.0):
+            resp = mock_client._post_multipart("https://u", {}, {"parent_node": "p"}, asset, "a.pdf")
+
+        assert resp is ok
+        assert post.call_count == 2
+        expected = 3.0 if getattr(failure, "status_code", None) == 429 else 1.0
+        sleep.assert_called_once_with(expected)
+
+    def test_client_error_not_retried(self, mock_client, asset):
+        """A 400 is returned straight away."""
+        bad = MagicMock(status_code=400)
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = bad
+
+        assert mock_client._post_multipart("https://u", {}, {}, asset, "a.pdf") is bad
+
+        mock_client._http.post.assert_called_once()
+
+    def test_gives_up_with_last_response(self, mock_client, asset):
+        """After API_MAX_RETRIES attempts the last response is returned."""
+        busy = MagicMock(status_code=502, headers={})
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = busy
+
+        with patch("doc_sync.feishu.media.time.sleep"):
+            assert mock_client._post_multipart("https://u", {}, {}, asset, "a.pdf") is busy
+
+        assert mock_client._http.post.call_count == API_MAX_RETRIES
+
+
+class TestUploadFile:
+    """Test upload_file result handling."""
+
+    def test_missing_parent_folder_reported(self, mock_client, asset):
+        """A 'parent node not exist' error invalidates the cached folder."""
+        mock_client._asset_cache = {}
+        mock_client._forget_upload_folder = MagicMock()
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"code": 1061044, "msg": "parent node not exist"}
+        mock_client._http = MagicMock()
+        mock_client._http.post.return_value = resp
+
+        assert mock_client.upload_file(asset, "fld") is None
+
+        mock_client._forget_upload_folder.assert_called_once_with("fld")
+
+    def test_large_file_uploaded_in_parts(self, mock_client, tmp_path):
+        """Files over the upload_all limit go through prepare/part/finish."""
+        path = tmp_path / "big.bin"
+        path.write_bytes(b"abcdefghij")
+        mock_client._asset_cache = {}
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        prepare = MagicMock(status_code=200)
+        prepare.json.return_value = {"code": 0, "data": {"upload_id": "u1", "block_size": 4, "block_num": 3}}
+        finish = MagicMock(status_code=200)
+        finish.json.return_value = {"code": 0, "data": {"file_token": "big_tok"}}
+        part_ok = MagicMock(status_code=200)
+        part_ok.json.return_value = {"code": 0}
+        sent = []
+
+        def post(url, headers, data, timeout):
+            if url.endswith("/upload_part"):
+                sent.append((data.fields["seq"], data.fields["file"][1]))
+                return part_ok
+            return prepare if url.endswith("/upload_prepare") else finish
+
+        mock_client._http.post.side_effect = post
+
+        with patch("doc_sync.feishu.media.UPLOAD_ALL_MAX_BYTES", 5):
+            assert mock_client.upload_file(str(path), "fld") == "big_tok"
+
+        assert sent == [("0", b"abcd"), ("1", b"efgh"), ("2", b"ij")]
+        finish_call = mock_client._http.post.call_args_list[-1]
+        assert json.loads(finish_call.kwargs["data"]) == {"upload_id": "u1", "block_num": 3}
+
+    def test_parts_reuse_pooled_connections(self, mock_client, tmp_path):
+        """Every request of a part upload goes through the client's session."""
+        path = tmp_path / "big.bin"
+        path.write_bytes(b"abcdefghij")
+        mock_client._asset_cache = {}
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"code": 0, "data": {"upload_id": "u1", "block_size": 4, "block_num": 3,
+                                                    "file_token": "big_tok"}}
+        mock_client._http.post.return_value = ok
+
+        with patch("doc_sync.feishu.media.UPLOAD_ALL_MAX_BYTES", 5), \
+                patch("doc_sync.feishu.media.requests_module.post") as unpooled:
+            assert mock_client.upload_file(str(path), "fld") == "big_tok"
+
+        unpooled.assert_not_called()
+        urls = [c.args[0].rsplit("/", 1)[1] for c in mock_client._http.post.call_args_list]
+        assert urls == ["upload_prepare"] + ["upload_part"] * 3 + ["upload_finish"]
+
+    def test_unchanged_file_reused_across_runs(self, mock_client, asset):
+        """A Drive upload from a previous run is reused while it still exists."""
+        mock_client._asset_cache = {}
+        resp = MagicMock(status_code=200)
+        resp.json.return_value = {"code": 0, "data": {"file_token": "ftok"}}
+        mock_client._http = MagicMock()
+        post = mock_client._http.post
+        post.return_value = resp
+        assert mock_client.upload_file(asset, "fld") == "ftok"
+
+        post.reset_mock()
+        mock_client._asset_cache = {}  # as after a restart
+        mock_client._file_tokens = None
+        mock_client.get_file_info = MagicMock(side_effect=[MagicMock(), None])
+        assert mock_client.upload_file(asset, "fld") == "ftok"
+        post.assert_not_called()
+
+        mock_client._asset_cache = {}
+        assert mock_client.upload_file(asset, "fld") == "ftok"  # gone: uploaded again
+        post.assert_called_once()
+
+
+class TestDownloadImage:
+    """Test streamed image downloads."""
+
+    @staticmethod
+    def _stream(chunks, status_code=200):
+        resp = MagicMock(status_code=status_code)
+        resp.__enter__.return_value = resp
+        resp.iter_content.return_value = chunks
+        return resp
+
+    def test_written_atomically(self, mock_client, tmp_path):
+        """The image appears at save_path only once fully written."""
+        save_path = tmp_path / "img" / "a.png"
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        mock_client._http.get.return_value = self._stream([b"ab", b"cd"])
+
+        assert mock_client.download_image("tok", str(save_path)) is True
+
+        assert save_path.read_bytes() == b"abcd"
+        assert not (tmp_path / "img" / "a.png.part").exists()
+
+    def test_repeat_download_reuses_saved_file(self, mock_client, tmp_path):
+        """The same token saved to the same path is fetched only once."""
+        save_path = tmp_path / "a.png"
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        mock_client._http.get.return_value = self._stream([b"ab"])
+
+        assert mock_client.download_image("tok", str(save_path)) is True
+        assert mock_client.download_image("tok", str(save_path)) is True
+        mock_client._http.get.assert_called_once()
+
+        save_path.unlink()  # removed locally: fetched again
+        assert mock_client.download_image("tok", str(save_path)) is True
+        assert mock_client._http.get.call_count == 2
+
+    def test_download_images_concurrently(self, mock_client, tmp_path):
+        """download_images saves every target and reports each result in order."""
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        mock_client._http.get.side_effect = lambda *a, **kw: self._stream([b"x"])
+        targets = [(tok, str(tmp_path / f"{tok}.png")) for tok in ("t1", "t2", "t3")]
+
+        assert mock_client.download_images(targets) == [True, True, True]
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["t1.png", "t2.png", "t3.png"]
+        mock_client.close()
+
+    def test_prefetch_images_downloads_distinct_tokens(self, mock_client, tmp_path):
+        """Each image token in the blocks is fetched once into save_dir."""
+        def block(block_type, token=None):
+            return MagicMock(block_type=block_type, image=MagicMock(token=token) if token else None)
+
+        mock_client.download_images = MagicMock()
+
+        mock_client.prefetch_images([block(27, "t1"), block(2), block(27, "t2"), block(27, "t1")], str(tmp_path))
+
+        mock_client.download_images.assert_called_once_with(
+            [("t1", str(tmp_path / "t1.png")), ("t2", str(tmp_path / "t2.png"))]
+        )
+
+    def test_interrupted_download_leaves_nothing(self, mock_client, tmp_path):
+        """A failure mid-stream removes the partial file."""
+        save_path = tmp_path / "a.png"
+
+        def broken():
+            yield b"ab"
+            raise requests.ConnectionError("reset")
+
+        mock_client._rate_limit = MagicMock()
+        mock_client._http = MagicMock()
+        mock_client._http.get.return_value = self._stream(broken())
+
+        assert mock_client.download_image("tok", str(save_path)) is False
+
+        assert not save_path.exists()
+        assert not (tmp_path / "a.png.part").exists()
+
+
+class TestUploadImage:
+    """Test upload_image routing."""
+
+    def test_large_image_uploaded_in_parts(self, mock_client, asset):
+        """Images over the upload_all limit use the medias part-upload API."""
+        mock_client._asset_cache = {}
+        mock_client._upload_in_parts = MagicMock(return_value=MagicMock(status_code=200))
+        mock_client._upload_in_parts.return_value.json.return_value = {"code": 0, "data": {"file_token": "img"}}
+
+        with patch("doc_sync.feishu.media.UPLOAD_ALL_MAX_BYTES", 1):
+            assert mock_client.upload_image(asset, "blk", drive_route_token="doc") == "img"
+
+        base_url, _, data = mock_client._upload_in_parts.call_args.args[:3]
+        assert base_url.endswith("/drive/v1/medias")
+        assert data["parent_type"] == "docx_image" and "drive_route_token" in data["extra"]
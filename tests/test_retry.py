@@ -0,0 +1,133 @@
+"""Tests for retry helpers."""
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from doc_sync.config import API_MAX_RETRIES
+from doc_sync.core.retry import parse_retry_after, with_rate_limit_retry
+
+
+def _resp(headers):
+    resp = Mock()
+    resp.headers = headers
+    return resp
+
+
+class TestParseRetryAfter:
+    """Test parse_retry_after."""
+
+    def test_seconds(self):
+        """Delta-seconds values are returned as floats."""
+        assert parse_retry_after(_resp({"Retry-After": "3"})) == 3.0
+
+    def test_http_date(self):
+        """HTTP-date values become the remaining delay."""
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        delay = parse_retry_after(_resp({"Retry-After": format_datetime(when, usegmt=True)}))
+
+        assert delay == pytest.approx(30, abs=2)
+
+    def test_past_date_is_zero(self):
+        """Dates in the past mean retry immediately."""
+        when = datetime.now(timezone.utc) - timedelta(seconds=30)
+
+        assert parse_retry_after(_resp({"Retry-After": format_datetime(when, usegmt=True)})) == 0.0
+
+    def test_feishu_reset_header(self):
+        """Feishu's rate-limit reset header is used as a fallback."""
+        assert parse_retry_after(_resp({"x-ogw-ratelimit-reset": "2"})) == 2.0
+
+    @pytest.mark.parametrize("headers", [
+        {"retry-after": "5"},
+        {"RETRY-AFTER": "5"},
+        {"X-Ogw-Ratelimit-Reset": "5"},
+    ])
+    def test_header_names_case_insensitive(self, headers):
+        """Hints are found whatever the casing of the header name."""
+        assert parse_retry_after(_resp(headers)) == 5.0
+
+    @pytest.mark.parametrize("headers", [{}, {"Retry-After": ""}, {"Retry-After": "soon"}])
+    def test_missing_or_invalid(self, headers):
+        """Absent or unparsable hints yield None."""
+        assert parse_retry_after(_resp(headers)) is None
+
+
+def _sdk_resp(code=0, status_code=200, headers=None):
+    resp = Mock()
+    resp.code = code
+    resp.raw.status_code = status_code
+    resp.raw.headers = headers or {}
+    return resp
+
+
+class TestWithRateLimitRetry:
+    """Test with_rate_limit_retry on SDK responses."""
+
+    @pytest.fixture(autouse=True)
+    def no_sleep(self):
+        with patch("doc_sync.core.retry.time.sleep") as sleep, \
+                patch("doc_sync.core.retry.random.uniform", return_value=0.0):
+            yield sleep
+
+    def test_rate_limit_honors_reset_header(self, no_sleep):
+        """A rate-limited response waits for the gateway's reset hint."""
+        ok = _sdk_resp()
+        call = Mock(side_effect=[_sdk_resp(99991400, 429, {"x-ogw-ratelimit-reset": "4"}), ok])
+
+        assert with_rate_limit_retry(call, "req") is ok
+
+        no_sleep.assert_called_once_with(4.0)
+
+    def test_server_error_retried_only_when_transient_allowed(self, no_sleep):
+        """5xx is retried for idempotent calls and returned for others."""
+        busy, ok = _sdk_resp(1, 503), _sdk_resp()
+
+        assert with_rate_limit_retry(Mock(side_effect=[busy, ok]), retry_transient=True) is ok
+        assert with_rate_limit_retry(Mock(side_effect=[busy, ok])) is busy
+
+    def test_connection_error_retried(self):
+        """Dropped connections are retried, and re-raised on the last attempt."""
+        ok = _sdk_resp()
+        assert with_rate_limit_retry(Mock(side_effect=[requests.ConnectionError(), ok]),
+                                     retry_transient=True) is ok
+
+        with pytest.raises(requests.ConnectionError):
+            with_rate_limit_retry(Mock(side_effect=requests.ConnectionError()), retry_transient=True)
+
+    @staticmethod
+    def _bad_gateway(*args, **kwargs):
+        """What the SDK does with a gateway's HTML 502 page."""
+        from lark_oapi.api.docx.v1 import GetDocumentBlockResponse
+        from lark_oapi.core.json import JSON
+        return JSON.unmarshal("<html>502 Bad Gateway</html>", GetDocumentBlockResponse)
+
+    def test_unparseable_body_retried_when_transient_allowed(self, no_sleep):
+        """A non-JSON 502 body is retried like other transient failures."""
+        ok = _sdk_resp()
+        call = Mock(side_effect=[json.JSONDecodeError("Expecting value", "<html>", 0), ok])
+
+        assert with_rate_limit_retry(call, retry_transient=True) is ok
+        no_sleep.assert_called_once()
+
+    @pytest.mark.parametrize("retry_transient", [True, False])
+    def test_unparseable_body_returns_failed_response(self, retry_transient):
+        """When not retried (again), the SDK's decode error becomes a failed response."""
+        call = Mock(side_effect=self._bad_gateway)
+
+        result = with_rate_limit_retry(call, retry_transient=retry_transient)
+
+        assert not result.success()
+        assert "Unparseable" in result.msg
+        assert call.call_count == (API_MAX_RETRIES if retry_transient else 1)
+
+    def test_gives_up_with_last_response(self):
+        """After max_retries attempts the last response is returned."""
+        limited = _sdk_resp(99991400)
+        call = Mock(return_value=limited)
+
+        assert with_rate_limit_retry(call) is limited
+        assert call.call_count == API_MAX_RETRIES
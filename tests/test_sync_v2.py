@@ -9,7 +9,7 @@ from doc_sync.sync import FolderSyncManager
 
 class TestSyncV2(unittest.TestCase):
     def setUp(self):
-        self.patcher = patch('doc_sync.feishu_client.lark')
+        self.patcher = patch('doc_sync.feishu.base.lark')
         self.mock_lark = self.patcher.start()
         
     def tearDown(self):
@@ -28,8 +28,8 @@ class TestSyncV2(unittest.TestCase):
             path = f.name
             
         try:
-            # Patch requests_module in the actual module where it's used
-            with patch('doc_sync.feishu.media.requests_module') as mock_requests:
+            # Uploads go through the client's pooled session
+            with patch.object(client, '_http') as mock_requests:
                 # Setup mock response for first upload
                 mock_resp = MagicMock()
                 mock_resp.status_code = 200
@@ -122,7 +122,7 @@ class TestIncrementalSync(unittest.TestCase):
     """Test incremental sync block update functionality."""
     
     def setUp(self):
-        self.patcher = patch('doc_sync.feishu_client.lark')
+        self.patcher = patch('doc_sync.feishu.base.lark')
         self.mock_lark = self.patcher.start()
         
     def tearDown(self):